@@ -6,22 +6,21 @@ from.
 # pyright: reportPrivateUsage = false
 from __future__ import annotations
 
+import array
 import bisect
 import dataclasses
-import itertools
+import functools
 import re as stdlib_re
 import typing
 from collections import defaultdict
 from dataclasses import dataclass
 from os import PathLike
 from pathlib import Path
-from typing import Any, Callable, Iterable
+from typing import Any, Callable, Iterable, Iterator
 
 from typing_extensions import SupportsIndex
 
 _RE_NEWLINE = stdlib_re.compile(r"\n")
-_RE_SPLITLINES = stdlib_re.compile(r"\r\n|[\n\r\v\f\x1c\x1d\x1e\x85\u2028\u2029]")
-_RE_WHITESPACE = stdlib_re.compile(r"\s+")
 
 
 class SourceStr(str):
@@ -75,93 +74,109 @@ class SourceStr(str):
         Not all slicing operations are source tracking, but ``[start:stop]``, ``[start:]``,
         ``[:stop]`` and ``[:]`` are.
         """
-        return SourceStr(super().__getitem__(key), self.source_map[key])
+        source_map = self.source_map
+        sliced_map = source_map[key]
+        if sliced_map is source_map:
+            return self
+        return SourceStr(super().__getitem__(key), sliced_map)
 
     def __add__(self, other: str) -> str:
         """Source tracking concatenation."""
-        return SourceStr(super().__add__(other), self.source_map + source_map(other))
+        if isinstance(other, SourceStr):
+            return SourceStr(super().__add__(other), self.source_map + other.source_map)
+        return SourceStr(super().__add__(other), self.source_map._extend_by(len(other)))
 
     def __radd__(self, other: str) -> str:
-        return SourceStr(other.__add__(self), source_map(other) + self.source_map)
+        return SourceStr(other.__add__(self), self.source_map._extend_by(len(other), before=True))
 
     def __str__(self) -> str:
         return self
 
+    def _slices(self, offsets: list[tuple[int, int]]) -> list[str]:
+        """Source tracking slicing for multiple ``(start, end)`` pairs at once.
+
+        The pairs have to be ordered by their start offsets, see `SourceMap._subslices`.
+        """
+        source_map = self.source_map
+        return [
+            (
+                self
+                if sliced_map is source_map
+                else SourceStr(str.__getitem__(self, slice(start, end)), sliced_map)
+            )
+            for (start, end), sliced_map in zip(offsets, source_map._subslices(offsets))
+        ]
+
     def splitlines(self, keepends: bool = False) -> list[str]:
         """Source tracking implementation of :external:meth:`str.splitlines`."""
-        result: list[str] = []
+        offsets: list[tuple[int, int]] = []
         pos = 0
-        for match in _RE_SPLITLINES.finditer(self):
-            result.append(self[pos : match.end() if keepends else match.start()])
-            pos = match.end()
-        if pos < len(self):
-            result.append(self[pos:])
-        return result
+
+        # We let the builtin str.splitlines find the line boundaries and only have to compute the
+        # corresponding offsets to slice the source map.
+        if keepends:
+            for line in str.splitlines(self, True):
+                end = pos + len(line)
+                offsets.append((pos, end))
+                pos = end
+        else:
+            for line, line_with_end in zip(str.splitlines(self), str.splitlines(self, True)):
+                offsets.append((pos, pos + len(line)))
+                pos += len(line_with_end)
+
+        return self._slices(offsets)
 
     def split(self, sep: str | None = None, maxsplit: SupportsIndex = -1) -> list[str]:
         """Source tracking implementation of :external:meth:`str.split`."""
         maxsplit = maxsplit.__index__()
-        if maxsplit == 0:
-            if sep is None:
-                stripped = self.lstrip()
-                return [stripped] if stripped else []
-            else:
-                return [self]
+
+        offsets: list[tuple[int, int]] = []
+
+        pos = 0
 
         if sep is None:
-            if maxsplit == 0:
-                return [self.lstrip()]
-            sep_re = _RE_WHITESPACE
-        else:
-            if not sep:
-                raise ValueError("empty separator")
-            sep_re = stdlib_re.compile(stdlib_re.escape(sep))
+            # The builtin str.split does the actual splitting, we only need to recover the offsets
+            # of the returned parts. As each part starts with a non-whitespace character and is
+            # preceded by whitespace only, the first occurrence after the previous part is the
+            # part itself.
+            for part in str.split(self, None, maxsplit):
+                start = str.find(self, part, pos)
+                pos = start + len(part)
+                offsets.append((start, pos))
+            return self._slices(offsets)
 
-        result: list[str] = []
+        if maxsplit == 0:
+            return [self]
 
-        pos = 0
+        if not sep:
+            raise ValueError("empty separator")
 
-        for match in sep_re.finditer(self):
-            if sep is None and match.start() == 0:
-                # Skip leading whitespace
-                pos = match.end()
-                continue
-            result.append(self[pos : match.start()])
-            pos = match.end()
-            if maxsplit >= 0 and len(result) == maxsplit:
+        sep_len = len(sep)
+        find = str.find
+
+        while (found := find(self, sep, pos)) != -1:
+            offsets.append((pos, found))
+            pos = found + sep_len
+            if len(offsets) == maxsplit:
                 break
 
-        if sep is not None or pos < len(self):
-            result.append(self[pos:])
+        offsets.append((pos, len(self)))
 
-        return result
+        return self._slices(offsets)
 
     def strip(self, chars: str | None = None) -> str:
         """Source tracking implementation of :external:meth:`str.strip`."""
-        chars_re = f"[{stdlib_re.escape(chars)}]" if chars is not None else r"\s"
-
-        if rmatch := stdlib_re.search(rf"{chars_re}+\Z", self):
-            if lmatch := stdlib_re.match(f"{chars_re}+", self):
-                return self[lmatch.end() : rmatch.start()]
-            return self[: rmatch.start()]
-        else:
-            return self.lstrip(chars)
+        lstripped = str.lstrip(self, chars)
+        start = len(self) - len(lstripped)
+        return self[start : start + len(str.rstrip(lstripped, chars))]
 
     def rstrip(self, chars: str | None = None) -> str:
         """Source tracking implementation of :external:meth:`str.rstrip`."""
-        chars_re = f"[{stdlib_re.escape(chars)}]" if chars is not None else r"\s"
-        if match := stdlib_re.search(rf"{chars_re}+\Z", self):
-            return self[: match.start()]
-        else:
-            return self
+        return self[: len(str.rstrip(self, chars))]
 
     def lstrip(self, chars: str | None = None) -> str:
         """Source tracking implementation of :external:meth:`str.lstrip`."""
-        chars_re = f"[{stdlib_re.escape(chars)}]" if chars is not None else r"\s"
-        if match := stdlib_re.match(f"{chars_re}+", self):
-            return self[match.end() :]
-        else:
-            return self
+        return self[len(self) - len(str.lstrip(self, chars)) :]
 
     def replace(self, old: str, new: str, count: SupportsIndex = -1) -> str:
         """Source tracking implementation of :external:meth:`str.replace`."""
@@ -193,7 +208,8 @@ class SourceStr(str):
 
     def as_plain_str(self) -> str:
         """Return a copy of the string without source tracking information."""
-        return f"{self}{''}"
+        # The builtin str.__str__ returns a plain copy for instances of str subclasses
+        return str.__str__(self)
 
 
 def plain_str(string: str) -> str:
@@ -214,12 +230,56 @@ def concat(strings: Iterable[str]) -> str:
     if not strings:
         return ""
 
-    concat_map = source_map(strings[0])
+    return SourceStr("".join(strings), _concat_source_maps(map(source_map, strings)))
+
+
+def _concat_source_maps(source_maps: Iterable[SourceMap]) -> SourceMap:
+    """Source map of the concatenation of strings with the given source maps.
+
+    This shifts all spans to their position in the concatenated string and merges spans that
+    continue in the source file where the previous span ended.
+    """
+    spans: list[SourceMapSpan] = []
+    offset = 0
+
+    for source_map in source_maps:
+        map_spans = source_map.spans
+        if map_spans:
+            if spans:
+                last = spans[-1]
+                first = map_spans[0]
+                if (
+                    last.str_end == offset
+                    and first.str_start == 0
+                    and last.file is first.file
+                    and last.file_end == first.file_start
+                ):
+                    spans[-1] = SourceMapSpan(
+                        str_start=last.str_start,
+                        len=last.len + first.len,
+                        file_start=last.file_start,
+                        file=last.file,
+                    )
+                    map_spans = map_spans[1:]
+            if offset:
+                spans.extend(
+                    SourceMapSpan(
+                        str_start=span.str_start + offset,
+                        len=span.len,
+                        file_start=span.file_start,
+                        file=span.file,
+                    )
+                    for span in map_spans
+                )
+            else:
+                # Nothing to shift, so we can reuse the existing span objects
+                spans.extend(map_spans)
+        offset += source_map.len
 
-    for string in strings[1:]:
-        concat_map += source_map(string)
+    if not spans:
+        return _empty_source_map(offset)
 
-    return SourceStr("".join(strings), source_map=concat_map)
+    return SourceMap(len=offset, spans=tuple(spans))
 
 
 def source_map(string: str) -> SourceMap:
@@ -228,7 +288,12 @@ def source_map(string: str) -> SourceMap:
     if isinstance(string, SourceStr):
         return string.source_map
     else:
-        return SourceMap(len=len(string), spans=())
+        return _empty_source_map(len(string))
+
+
+@functools.lru_cache(maxsize=1024)
+def _empty_source_map(len: int) -> SourceMap:
+    return SourceMap(len=len, spans=())
 
 
 def read_file(
@@ -316,7 +381,7 @@ def _from_content(
 
     cached_content: str | None = content
 
-    newlines = tuple(match.start() for match in _RE_NEWLINE.finditer(content))
+    newlines = array.array("q", [match.start() for match in _RE_NEWLINE.finditer(content)])
 
     if not (store_content or (store_content is None and len(content) < 1024 * 1024)):
         cached_content = None
@@ -353,51 +418,58 @@ class SourceSpans:
         else:
             return "<unknown>"
 
-    def __str__(self) -> str:
+    # Formatting requires line and column lookups for every span, but spans are immutable, so we
+    # only do this once per instance.
+
+    @functools.cached_property
+    def _formatted_str(self) -> str:
         return self._str(str)
 
-    def __repr__(self) -> str:
+    @functools.cached_property
+    def _formatted_repr(self) -> str:
         return self._str(repr)
 
+    def __str__(self) -> str:
+        return self._formatted_str
+
+    def __repr__(self) -> str:
+        return self._formatted_repr
+
     def close_gaps(self, max_gap: int = 3, line_mode: bool = False) -> SourceSpans:
         """Sorts contained spans and merges almost adjacent spans.
 
         :param max_gap: The maximum gap between two spans that will be merged.
         :returns: A new `SourceSpans` with sorted and merged spans.
         """
-        spans: list[SourceSpan] = []
-        file_order: dict[SourceFile, int] = {}
-        for span in self.spans:
-            file_order[span.file] = len(file_order)
-        for span in sorted(self.spans, key=lambda span: (file_order[span.file], span.file_start)):
-            if not spans:
-                spans.append(span)
-                continue
-            last = spans[-1]
-            merge = False
-            if last.file == span.file:
-                if line_mode:
-                    last_end_line, _ = last.file.text_position(last.file_end)
-                    span_start_line, _ = span.file.text_position(span.file_start)
-
-                    merge = last_end_line + max_gap >= span_start_line
-                else:
-                    merge = last.file_end + max_gap >= span.file_start
-
-            if merge:
-                spans[-1] = dataclasses.replace(
-                    last, len=max(last.len, span.file_end - last.file_start)
-                )
-            else:
-                spans.append(span)
-        return SourceSpans(spans=tuple(spans))
+        return SourceSpans(
+            spans=tuple(
+                span
+                for file_spans in self._close_gaps_by_file(max_gap, line_mode).values()
+                for span in file_spans
+            )
+        )
 
-    def group_by_file(self) -> dict[SourceFile, SourceSpans]:
+    def _close_gaps_by_file(
+        self, max_gap: int = 3, line_mode: bool = False
+    ) -> dict[SourceFile, list[SourceSpan]]:
+        """Like `close_gaps` but returns the sorted and merged spans grouped by file."""
+        by_file = self._spans_by_file()
+        for file, file_spans in by_file.items():
+            file_spans.sort(key=lambda span: span.file_start)
+            by_file[file] = _merge_sorted_spans(file, file_spans, max_gap, line_mode)
+        return by_file
+
+    def _spans_by_file(self) -> dict[SourceFile, list[SourceSpan]]:
+        """Groups the contained spans by file, keeping files in order of their first occurrence."""
         by_file: dict[SourceFile, list[SourceSpan]] = defaultdict(list)
         for span in self.spans:
             by_file[span.file].append(span)
+        return by_file
 
-        return {file: SourceSpans(spans=tuple(spans)) for file, spans in by_file.items()}
+    def group_by_file(self) -> dict[SourceFile, SourceSpans]:
+        return {
+            file: SourceSpans(spans=tuple(spans)) for file, spans in self._spans_by_file().items()
+        }
 
     def __add__(self, other: SourceSpans) -> SourceSpans:
         """Concatenates two collections of source spans."""
@@ -407,6 +479,39 @@ class SourceSpans:
         return bool(self.spans)
 
 
+def _merge_sorted_spans(
+    file: SourceFile, spans: list[SourceSpan], max_gap: int, line_mode: bool
+) -> list[SourceSpan]:
+    """Merges almost adjacent spans of a single file that are already sorted by their start."""
+    merged: list[SourceSpan] = []
+    text_position = file.text_position
+
+    last = spans[0]
+    last_start = last.file_start
+    last_end = last.file_end
+
+    for span in spans[1:]:
+        span_start = span.file_start
+        span_end = span.file_end
+
+        if line_mode:
+            merge = text_position(last_end)[0] + max_gap >= text_position(span_start)[0]
+        else:
+            merge = last_end + max_gap >= span_start
+
+        if merge:
+            if span_end > last_end:
+                last_end = span_end
+                last = SourceSpan(len=last_end - last_start, file_start=last_start, file=file)
+        else:
+            merged.append(last)
+            last = span
+            last_start = span_start
+            last_end = span_end
+    merged.append(last)
+    return merged
+
+
 @dataclass(frozen=True, repr=False)
 class SourceMap(SourceSpans):
     """Maps string contents to their source files.
@@ -429,8 +534,7 @@ class SourceMap(SourceSpans):
     def __getitem__(self, key: SupportsIndex | slice) -> SourceMap | None:
         if isinstance(key, slice):
             if key.step is None or key.step == 1:
-                start = self._index(key.start, 0)
-                end = self._index(key.stop, None)
+                start, end, _ = key.indices(self.len)
                 return self._for_subslice(start, end)
             else:
                 raise IndexError("SourceMap only supports slicing with the default step of 1.")
@@ -462,7 +566,25 @@ class SourceMap(SourceSpans):
         end_pos = self.len if end is None else end
 
         if start >= end_pos:
-            return SourceMap(len=0, spans=())
+            return _empty_source_map(0)
+
+        if start == 0 and end_pos == self.len:
+            return self
+
+        if self.simple_span:
+            # Any subslice of a single span covering the whole string is again such a span
+            span = self.spans[0]
+            return SourceMap(
+                len=end_pos - start,
+                spans=(
+                    SourceMapSpan(
+                        str_start=0,
+                        len=end_pos - start,
+                        file_start=span.file_start + start,
+                        file=span.file,
+                    ),
+                ),
+            )
 
         span_indices = range(self._bisect_starting_at(start), self._bisect_ending_at(end))
 
@@ -472,22 +594,68 @@ class SourceMap(SourceSpans):
 
         return SourceMap(len=end_pos - start, spans=output_spans)
 
+    def _subslices(self, offsets: Iterable[tuple[int, int]]) -> Iterator[SourceMap]:
+        """Source maps for a sequence of subslices.
+
+        This produces the same source maps as slicing with ``[start:end]`` for each given pair,
+        but requires the pairs to be ordered by their start offsets. This allows finding the
+        overlapping spans by walking the spans once, instead of using a binary search per subslice.
+
+        :param offsets: Pairs of non-negative ``start`` and ``end`` offsets of the subslices.
+        :returns: An iterator yielding the source map for each subslice.
+        """
+        if self.simple_span:
+            # Here each subslice is a single span that doesn't require searching, see _for_subslice
+            for start, end in offsets:
+                yield self._for_subslice(start, min(end, self.len))
+            return
+
+        spans = self.spans
+        span_count = len(spans)
+        str_starts = self._str_starts
+        str_ends = self._str_ends
+        first = 0
+
+        for start, end in offsets:
+            end = min(end, self.len)
+            if start >= end:
+                yield _empty_source_map(0)
+                continue
+            if start == 0 and end == self.len:
+                yield self
+                continue
+
+            while first < span_count and str_ends[first] <= start:
+                first += 1
+            last = first
+            while last < span_count and str_starts[last] < end:
+                last += 1
+
+            yield SourceMap(
+                len=end - start,
+                spans=tuple(
+                    spans[i]._for_subslice_unchecked(start, end) for i in range(first, last)
+                ),
+            )
+
+    # The span offsets are also stored column-wise in packed arrays, which is more compact than the
+    # span objects and avoids attribute lookups when searching for spans.
+
+    @functools.cached_property
+    def _str_starts(self) -> array.array[int]:
+        return array.array("q", [span.str_start for span in self.spans])
+
+    @functools.cached_property
+    def _str_ends(self) -> array.array[int]:
+        return array.array("q", [span.str_end for span in self.spans])
+
     def _bisect_starting_at(self, at: int) -> int:
         """Index of the first span that overlaps a subslice.
 
         :param at: The start of the subslice.
         :returns: The index of the first span that overlaps the subslice.
         """
-        # FUTURE Python 3.10 use bisect.bisect_right with the new key parameter
-        lo = 0
-        hi = len(self.spans)
-        while lo < hi:
-            mid = (lo + hi) // 2
-            if at < self.spans[mid].str_end:
-                hi = mid
-            else:
-                lo = mid + 1
-        return lo
+        return bisect.bisect_right(self._str_ends, at)
 
     def _bisect_ending_at(self, at: int | None) -> int:
         """Index after the last span that overlaps a subslice.
@@ -495,18 +663,9 @@ class SourceMap(SourceSpans):
         :param at: The end of the subslice or ``None`` if it extends to the end of the string.
         :returns: The index of the last span that overlaps the subslice.
         """
-        # FUTURE Python 3.10 use bisect.bisect_left with the new key parameter
         if at is None:
             return len(self.spans)
-        lo = 0
-        hi = len(self.spans)
-        while lo < hi:
-            mid = (lo + hi) // 2
-            if self.spans[mid].str_start < at:
-                lo = mid + 1
-            else:
-                hi = mid
-        return lo
+        return bisect.bisect_left(self._str_starts, at)
 
     @typing.overload
     def __add__(self, other: SourceMap) -> SourceMap: ...
@@ -518,49 +677,31 @@ class SourceMap(SourceSpans):
         if not isinstance(other, SourceMap):
             return super().__add__(other)
         if not other.spans:
-            return SourceMap(len=self.len + other.len, spans=self.spans)
-        if self.spans and other.spans:
-            self_last = self.spans[-1]
-            other_first = other.spans[0]
-            if (
-                self_last.str_end == self.len
-                and other_first.str_start == 0
-                and self_last.file == other_first.file
-                and self_last.file_end == other_first.file_start
-            ):
-                return SourceMap(
-                    len=self.len + other.len,
-                    spans=tuple(
-                        itertools.chain(
-                            self.spans[:-1],
-                            (dataclasses.replace(self_last, len=self_last.len + other_first.len),),
-                            (
-                                dataclasses.replace(span, str_start=span.str_start + self.len)
-                                for span in other.spans[1:]
-                            ),
-                        )
-                    ),
-                )
+            return self._extend_by(other.len)
+        return _concat_source_maps((self, other))
 
-        return SourceMap(
-            len=self.len + other.len,
-            spans=tuple(
-                itertools.chain(
-                    self.spans,
-                    (
-                        dataclasses.replace(span, str_start=span.str_start + self.len)
-                        for span in other.spans
-                    ),
-                )
-            ),
-        )
+    def _extend_by(self, len: int, *, before: bool = False) -> SourceMap:
+        """Source map for the string extended by an untracked string of the given length.
+
+        :param len: The length of the untracked string.
+        :param before: Whether the untracked string is prepended instead of appended.
+        """
+        if not len:
+            return self
+        if not self.spans:
+            return _empty_source_map(self.len + len)
+        if before:
+            return _concat_source_maps((_empty_source_map(len), self))
+        return SourceMap(len=self.len + len, spans=self.spans)
 
     @property
     def simple_span(self) -> bool:
         """Whether the source map is a single span that maps the entire string."""
-        return (
-            len(self.spans) == 1 and self.spans[0].str_start == 0 and self.spans[0].len == self.len
-        )
+        spans = self.spans
+        if len(spans) != 1:
+            return False
+        span = spans[0]
+        return span.str_start == 0 and span.len == self.len
 
     def _str(self, to_str: Callable[[SourceMapSpan], str]) -> str:
         if self.simple_span:
@@ -592,12 +733,6 @@ class SourceMap(SourceSpans):
                     out.append("." * chars)
             return "".join(out)
 
-    def __str__(self) -> str:
-        return self._str(str)
-
-    def __repr__(self) -> str:
-        return self._str(repr)
-
     def __bool__(self) -> bool:
         return bool(self.spans)
 
@@ -612,12 +747,15 @@ class SourceMap(SourceSpans):
         )
 
 
-@dataclass(frozen=True, repr=False)
+@dataclass(frozen=True, repr=False, eq=False)
 class SourceFile:
     """A source file of a string.
 
     This stores the path to the file and optionally the file's content. The content can be used when
     printing error messages, to show the context of the error.
+
+    Source files compare by identity, each call to `read_file` or `from_content` creates a new
+    distinct source file.
     """
 
     user_path: Path
@@ -626,8 +764,12 @@ class SourceFile:
     absolute_path: Path
     """The absolute path to the file."""
 
-    newlines: tuple[int, ...]
-    """The indices of all newlines in the file."""
+    newlines: array.array[int]
+    """The indices of all newlines in the file.
+
+    These are stored as a packed array of 64-bit integers, which is much more compact than a tuple
+    of Python integers for large files.
+    """
 
     content: str | None = None
     """The content of the file.
@@ -635,6 +777,10 @@ class SourceFile:
     This is optional as we may not want to store huge files in memory.
     """
 
+    _text_position_cache: dict[int, tuple[int, int]] = dataclasses.field(
+        default_factory=dict, init=False
+    )
+
     def __str__(self) -> str:
         return f"{self.user_path}"
 
@@ -650,9 +796,14 @@ class SourceFile:
         :param at: The offset in the file.
         :returns: A tuple of the line and column number, both starting at 1.
         """
+        try:
+            return self._text_position_cache[offset]
+        except KeyError:
+            pass
         line = bisect.bisect_left(self.newlines, offset)
         preceding_newline = self.newlines[line - 1] if line > 0 else -1
-        return line + 1, offset - preceding_newline
+        position = self._text_position_cache[offset] = (line + 1, offset - preceding_newline)
+        return position
 
     def text_lines(self, start_line: int, end_line: int) -> str:
         if self.content is None:
@@ -674,6 +825,8 @@ class SourceSpan:
     All offsets use Python's native string indexing, i.e. they count unicode codepoints.
     """
 
+    __slots__ = ("len", "file_start", "file")
+
     len: int
     """Length of the span."""
 
@@ -683,6 +836,16 @@ class SourceSpan:
     file: SourceFile
     """The source file that contains the span."""
 
+    def __copy__(self) -> SourceSpan:
+        return self
+
+    def __deepcopy__(self, memo: dict[int, Any]) -> SourceSpan:
+        return self
+
+    def __reduce__(self) -> tuple[Any, ...]:
+        # The frozen dataclass's `__setattr__` would reject restoring the slots one by one
+        return type(self), (self.len, self.file_start, self.file)
+
     @property
     def file_end(self) -> int:
         """End of the span in the source file."""
@@ -710,9 +873,14 @@ class SourceMapSpan(SourceSpan):
     All offsets use Python's native string indexing, i.e. they count unicode codepoints.
     """
 
+    __slots__ = ("str_start",)
+
     str_start: int
     """Start of the span in the string."""
 
+    def __reduce__(self) -> tuple[Any, ...]:
+        return type(self), (self.len, self.file_start, self.file, self.str_start)
+
     @property
     def str_end(self) -> int:
         """End of the span in the string."""
@@ -729,19 +897,17 @@ class SourceMapSpan(SourceSpan):
         :returns: The part of the span that overlaps the subslice.
         """
 
-        str_start = self.str_start
+        str_start = self.str_start - start
         len = self.len
         file_start = self.file_start
 
-        if start > self.str_start:
-            shorten = start - self.str_start
+        if str_start < 0:
+            file_start -= str_start
+            len += str_start
             str_start = 0
-            file_start += shorten
-            len -= shorten
 
-        if end is not None and start + len > end:
-            shorten = start + len - end
-            len -= shorten
+        if end is not None and start + str_start + len > end:
+            len = end - start - str_start
 
         return SourceMapSpan(
             str_start=str_start,
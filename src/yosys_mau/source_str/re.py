@@ -1,6 +1,8 @@
 # pyright: reportPrivateUsage = false
 from __future__ import annotations
 
+import functools
+import itertools
 import re
 import sys
 from dataclasses import dataclass
@@ -15,24 +17,97 @@ from typing import (
     overload,
 )
 
+from . import SourceStr, concat
+
 _T = TypeVar("_T")
 
-_TEMPLATE_PART_RE = re.compile(
-    r"""
-        (?P<escape_free> [^\\]+) |
-        \\ (
-            g < (?P<group_name> [^>]* ) > |
-            (?P<octal> 0[0-7]{0,2} | [1-6][0-7]{2}) |
-            (?P<group_index> [1-9][0-9]* ) |
-            (?P<single_character> . )
-        )
-    """,
-    re.VERBOSE | re.DOTALL,
-)
+_DIGITS = frozenset("0123456789")
+_OCTAL_DIGITS = frozenset("01234567")
+_TEMPLATE_ESCAPES = {
+    "a": "\a",
+    "b": "\b",
+    "f": "\f",
+    "n": "\n",
+    "r": "\r",
+    "t": "\t",
+    "v": "\v",
+    "\\": "\\",
+}
+
+
+@functools.lru_cache(maxsize=512)
+def _parse_template(pattern: re.Pattern[str], template: str) -> tuple[str | int, ...]:
+    """Split a replacement template into literal strings and group indices."""
+    pattern.sub(template, "")  # just to get the same error handling, this validates the template
+
+    parts: list[str | int] = []
+    literal: list[str] = []
+
+    def append_group(group: int) -> None:
+        if literal:
+            parts.append("".join(literal))
+            literal.clear()
+        parts.append(group)
+
+    find = template.find
+    pos = 0
+
+    while (escape := find("\\", pos)) >= 0:
+        if escape > pos:
+            literal.append(template[pos:escape])
+
+        # The template is valid, so every backslash is followed by at least one character
+        pos = escape + 2
+        char = template[escape + 1]
+
+        if char == "g" and template[pos : pos + 1] == "<":
+            name_end = find(">", pos + 1)
+            name = template[pos + 1 : name_end]
+            append_group(int(name) if name.isdigit() else pattern.groupindex[name])
+            pos = name_end + 1
+        elif char == "0":
+            while pos < escape + 4 and template[pos : pos + 1] in _OCTAL_DIGITS:
+                pos += 1
+            literal.append(chr(int(template[escape + 1 : pos], 8)))
+        elif char in _DIGITS:
+            # Like the stdlib, read a group number of at most two digits, unless there are
+            # three octal digits
+            if template[pos : pos + 1] in _DIGITS:
+                pos += 1
+                if (
+                    char in _OCTAL_DIGITS
+                    and template[pos - 1] in _OCTAL_DIGITS
+                    and template[pos : pos + 1] in _OCTAL_DIGITS
+                ):
+                    pos += 1
+                    literal.append(chr(int(template[escape + 1 : pos], 8)))
+                    continue
+            append_group(int(template[escape + 1 : pos]))
+        else:
+            # Unknown ASCII letter escapes were rejected above, other characters keep the backslash
+            literal.append(_TEMPLATE_ESCAPES.get(char, template[escape:pos]))
+
+    if pos < len(template):
+        literal.append(template[pos:])
+    if literal:
+        parts.append("".join(literal))
+
+    return tuple(parts)
 
 
 def compile(pattern: str, flags: int | re.RegexFlag = 0) -> Pattern:
-    """Source tracking wrapper for :external:func:`re.compile`."""
+    """Source tracking wrapper for :external:func:`re.compile`.
+
+    Like :external:func:`re.compile` this caches compiled patterns, so compiling the same pattern
+    with the same flags repeatedly may return the identical `Pattern` object.
+    """
+    if not isinstance(pattern, str):
+        return Pattern(re.compile(pattern, flags))
+    return _compile_cached(pattern, int(flags))
+
+
+@functools.lru_cache(maxsize=512)
+def _compile_cached(pattern: str, flags: int) -> Pattern:
     return Pattern(re.compile(pattern, flags))
 
 
@@ -91,16 +166,37 @@ def subn(
 
 escape = re.escape
 
-purge = re.purge
+
+def purge() -> None:
+    """Source tracking wrapper for :external:func:`re.purge`.
+
+    This also clears the cache of `Pattern` objects used by `compile` and the cache of parsed
+    templates used by `Match.expand`.
+    """
+    _compile_cached.cache_clear()
+    _parse_template.cache_clear()
+    re.purge()
 
 
 @dataclass(frozen=True)
 class Pattern:
     """Source tracking wrapper for :external:mod:`re` ``Pattern`` objects."""
 
+    __slots__ = ("wrapped",)
+
     wrapped: re.Pattern[str]
     """The wrapped plain :external:mod:`re` ``Pattern`` object."""
 
+    def __copy__(self) -> Pattern:
+        return self
+
+    def __deepcopy__(self, memo: dict[int, Any]) -> Pattern:
+        return self
+
+    def __reduce__(self) -> tuple[type[Pattern], tuple[re.Pattern[str]]]:
+        # The default slot restoring would assign to the frozen field
+        return Pattern, (self.wrapped,)
+
     def search(self, string: str, pos: int = 0, endpos: int = sys.maxsize) -> Match | None:
         """Source tracking wrapper for :external:meth:`re.Pattern.search`."""
         match = self.wrapped.search(string, pos, endpos)
@@ -118,19 +214,32 @@ class Pattern:
 
     def split(self, string: str, maxsplit: int = 0) -> list[str]:
         """Source tracking implementation of :external:meth:`re.Pattern.split`."""
-        result: list[str] = []
+        if type(string) is str and not self.wrapped.groups and maxsplit >= 0:
+            # Nothing to track and no groups that would be included in the result
+            return self.wrapped.split(string, maxsplit)
+        offsets: list[tuple[int, int]] = []
         pos = 0
         for match in self.wrapped.finditer(string):
-            result.append(string[pos : match.start()])
+            offsets.append((pos, match.start()))
             pos = match.end()
             maxsplit -= 1
             if maxsplit == 0:
                 break
-        result.append(string[pos:])
-        return result
+        offsets.append((pos, len(string)))
+
+        if isinstance(string, SourceStr):
+            return string._slices(offsets)
+        return [string[start:end] for start, end in offsets]
 
     def findall(self, string: str, pos: int = 0, endpos: int = sys.maxsize) -> list[str]:
         """Source tracking implementation of :external:meth:`re.Pattern.findall`."""
+        if type(string) is str and not self.wrapped.groups:
+            return self.wrapped.findall(string, pos, endpos)
+        if isinstance(string, SourceStr):
+            # The matches are ordered, so we can slice them all at once
+            return string._slices(
+                [match.span() for match in self.wrapped.finditer(string, pos, endpos)]
+            )
         return [match._group(0) for match in self.finditer(string, pos, endpos)]
 
     def finditer(self, string: str, pos: int = 0, endpos: int = sys.maxsize) -> Iterator[Match]:
@@ -145,7 +254,11 @@ class Pattern:
         self, repl: str | Callable[[Match], str], string: str, count: int = 0
     ) -> tuple[str, int]:
         """Source tracking implementation of :external:meth:`re.Pattern.subn`."""
-        from . import concat
+        matches = self.wrapped.finditer(string)
+        first = next(matches, None)
+        if first is None:
+            # Nothing to substitute, so there is no need to split and re-concatenate the string
+            return string, 0
 
         if isinstance(repl, str):
             repl_str = repl
@@ -153,25 +266,32 @@ class Pattern:
         else:
             repl_fn = repl
 
-        counter = 0
+        offsets: list[tuple[int, int]] = []
+        replacements: list[str] = []
+        pos = 0
 
-        def generate() -> Iterable[str]:
-            nonlocal counter
+        for match in map(Match, itertools.chain((first,), matches)):
+            start, end = match.wrapped.span()
+            offsets.append((pos, start))
+            replacements.append(repl_fn(match))
+            pos = end
 
-            pos = 0
+            if len(replacements) == count:
+                break
 
-            for match in self.finditer(string):
-                counter += 1
-                yield string[pos : match.start()]
-                yield repl_fn(match)
-                pos = match.end()
+        offsets.append((pos, len(string)))
 
-                if counter == count:
-                    break
+        if isinstance(string, SourceStr):
+            pieces = string._slices(offsets)
+        else:
+            pieces = [string[start:end] for start, end in offsets]
 
-            yield string[pos:]
+        # Interleave the unchanged pieces of the input with the replacements
+        parts = [""] * (len(pieces) + len(replacements))
+        parts[::2] = pieces
+        parts[1::2] = replacements
 
-        return concat(generate()), counter
+        return concat(parts), len(replacements)
 
     @property
     def flags(self) -> int:
@@ -198,9 +318,17 @@ class Pattern:
 class Match:
     """Source tracking wrapper for :external:mod:`re` `Match` objects."""
 
+    __slots__ = ("wrapped",)
+
     wrapped: re.Match[str]
     """The wrapped plain :external:mod:`re` Match object."""
 
+    def __copy__(self) -> Match:
+        return self
+
+    def __deepcopy__(self, memo: dict[int, Any]) -> Match:
+        return self
+
     @property
     def pos(self) -> int:
         """Forwards to :external:attr:`re.Match.pos`."""
@@ -291,12 +419,17 @@ class Match:
     def _group(self, group: int | str) -> str | None: ...
 
     def _group(self, group: int | str, default: Any = None) -> Any:
-        if group == 0:
-            return self.string[self.start() : self.end()]
-        span = self.wrapped.span(group)
-        if span == (-1, -1):
+        wrapped = self.wrapped
+        string = wrapped.string
+        if type(string) is str:
+            # Without source tracking information, slicing produces the same plain strings that
+            # the wrapped match returns.
+            group_str = wrapped.group(group)
+            return default if group_str is None else group_str
+        start, end = wrapped.span(group)
+        if start == -1:
             return default
-        return self.string[span[0] : span[1]]
+        return string[start:end]
 
     @overload
     def groups(self) -> tuple[str | None, ...]: ...
@@ -306,7 +439,10 @@ class Match:
 
     def groups(self, default: Any = None) -> tuple[Any, ...]:
         """Source tracking wrapper for :external:meth:`re.Match.groups`."""
-        return tuple(self._group(group, default) for group in range(1, 1 + self.wrapped.re.groups))
+        wrapped = self.wrapped
+        if type(wrapped.string) is str:
+            return wrapped.groups(default)
+        return tuple(self._indexed_groups(range(1, 1 + wrapped.re.groups), default))
 
     @overload
     def groupdict(self) -> dict[str, str | None]: ...
@@ -316,41 +452,30 @@ class Match:
 
     def groupdict(self, default: Any = None) -> dict[str, Any]:
         """Source tracking wrapper for :external:meth:`re.Match.groupdict`."""
-        return {name: self._group(name, default) for name in self.wrapped.re.groupindex.keys()}
+        wrapped = self.wrapped
+        if type(wrapped.string) is str:
+            return wrapped.groupdict(default)
+        groupindex = wrapped.re.groupindex
+        return dict(zip(groupindex, self._indexed_groups(groupindex.values(), default)))
+
+    def _indexed_groups(self, indices: Iterable[int], default: Any) -> Iterator[Any]:
+        # Like _group, but binds the lookups once for all groups and only accepts group indices
+        wrapped = self.wrapped
+        string = wrapped.string
+        span = wrapped.span
+        for index in indices:
+            start, end = span(index)
+            yield default if start == -1 else string[start:end]
 
     def expand(self, template: str) -> str:
         """Source tracking implementation of :external:meth:`re.Match.expand`."""
-        from . import concat
-
         if "\\" not in template:
             return template
 
-        output: list[str] = []
-
-        self.wrapped.expand(template)  # just to get the same error handling
-
-        for match in _TEMPLATE_PART_RE.finditer(template):
-            escape_free = match["escape_free"]
-            if escape_free is not None:
-                output.append(escape_free)
-                continue
-            octal = match["octal"]
-            if octal is not None:
-                output.append(chr(int(octal, 8)))
-                continue
-            group_name = match["group_name"]
-            if group_name is not None:
-                group = self.group(group_name)
-                assert group is not None
-                output.append(group)
-                continue
-            group_index = match["group_index"]
-            if group_index is not None:
-                group = self.group(int(group_index))
-                assert group is not None
-                output.append(group)
-                continue
-            output.append(self.wrapped.expand(match[0]))
+        output = [
+            part if type(part) is str else self._group(part, "")
+            for part in _parse_template(self.wrapped.re, template)
+        ]
 
         return concat(output)
 
@@ -1,3 +1,4 @@
+# pyright: reportPrivateUsage = false
 """Diagnostic reporting using source tracking strings.
 
 .. warning::
@@ -7,7 +8,6 @@
 
 from __future__ import annotations
 
-from collections import defaultdict
 from dataclasses import dataclass
 
 from .. import source_str
@@ -56,31 +56,63 @@ class Report:
     def __str__(self) -> str:
         out = [f"{self.message}\n"]
 
-        for file, spans in self.spans.close_gaps().group_by_file().items():
+        for file, spans in self.spans._close_gaps_by_file().items():
             if file.content is None:
                 raise NotImplementedError
 
-            highlights: dict[int, list[str]] = defaultdict(list)
-
-            for span in spans.spans:
-                for pos in range(span.file_start, span.file_end):
-                    span_line, span_col = file.text_position(pos)
-                    line_highlights = highlights[span_line]
-                    line_highlights.extend([" "] * (span_col - len(line_highlights)))
-                    line_highlights[span_col - 1] = "^"
-
-            line_spans = spans.close_gaps(line_mode=True)
+            # The spans are sorted and disjoint, so all highlighted lines are between the first
+            # span's start and the last span's end. We store them densely indexed by line number.
+            first_line = file.text_position(spans[0].file_start)[0]
+            last_line = file.text_position(spans[-1].file_end)[0]
+            highlights: list[bytearray | None] = [None] * (last_line - first_line + 1)
+
+            newlines = file.newlines
+
+            # Chunks of lines to show, as ranges of first and last line. Spans that are at most
+            # three lines apart are shown in the same chunk.
+            line_ranges: list[list[int]] = []
+
+            for span in spans:
+                pos = span.file_start
+                end = span.file_end
+                span_line, span_col = file.text_position(pos)
+                end_line, _ = file.text_position(end)
+
+                if line_ranges and line_ranges[-1][1] + 3 >= span_line:
+                    line_ranges[-1][1] = max(line_ranges[-1][1], end_line)
+                else:
+                    line_ranges.append([span_line, end_line])
+
+                # Instead of looking up the position of every highlighted character, we highlight
+                # the span one line segment at a time.
+                while pos < end:
+                    # A line's segment includes the terminating newline
+                    line_end = newlines[span_line - 1] + 1 if span_line <= len(newlines) else end
+                    segment_end = min(end, line_end)
+                    segment_len = segment_end - pos
+                    col_end = span_col - 1 + segment_len
+
+                    line_highlights = highlights[span_line - first_line]
+                    if line_highlights is None:
+                        line_highlights = highlights[span_line - first_line] = bytearray()
+                    padding = col_end - len(line_highlights)
+                    if padding > 0:
+                        line_highlights += b" " * padding
+                    line_highlights[span_col - 1 : col_end] = b"^" * segment_len
+
+                    pos = segment_end
+                    span_line += 1
+                    span_col = 1
 
             out.append(f"{file}:\n")
 
-            max_line = max(file.text_position(span.file_end)[0] for span in line_spans.spans) + 1
+            max_line = line_ranges[-1][1] + 1
             max_line = min(len(file.newlines) + 1, max_line)
             line_digits = max(len(str(max_line)), 2)
+            line_format = f"%{line_digits}d | %s\n"
+            highlight_prefix = " " * line_digits + " | "
 
-            for chunk_index, span in enumerate(line_spans.spans):
-                start_line, _ = file.text_position(span.file_start)
-                end_line, _ = file.text_position(span.file_end)
-
+            for chunk_index, (start_line, end_line) in enumerate(line_ranges):
                 context_start_line = max(1, start_line - 1)
                 context_end_line = min(len(file.newlines) + 1, end_line + 1)
 
@@ -91,8 +123,10 @@ class Report:
                     file.text_lines(context_start_line, context_end_line).splitlines(),
                     context_start_line,
                 ):
-                    out.append(f"{line_nr:{line_digits}} | {line}\n")
-                    if line_nr in highlights:
-                        out.append(f"{' ':{line_digits}} | {''.join(highlights[line_nr])}\n")
+                    out.append(line_format % (line_nr, line))
+                    if first_line <= line_nr <= last_line:
+                        line_highlights = highlights[line_nr - first_line]
+                        if line_highlights is not None:
+                            out.append(highlight_prefix + line_highlights.decode("ascii") + "\n")
 
         return "".join(out)
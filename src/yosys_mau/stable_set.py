@@ -1,6 +1,7 @@
 from __future__ import annotations
 
-from typing import Collection, Container, Iterable, Iterator, Sized, TypeVar
+from itertools import filterfalse, repeat
+from typing import Any, Collection, Container, Iterable, Iterator, Sized, TypeVar
 
 from typing_extensions import Self
 
@@ -19,7 +20,7 @@ class StableSet(Collection[T]):
     _inner: dict[T, None]
 
     def __init__(self, iterable: Iterable[T] = ()) -> None:
-        self._inner = {item: None for item in iterable}
+        self._inner = dict.fromkeys(iterable)
 
     @staticmethod
     def _from_inner(inner: dict[T, None]) -> StableSet[T]:
@@ -43,48 +44,67 @@ class StableSet(Collection[T]):
         return item in self._inner
 
     def __repr__(self) -> str:
-        return f"{type(self).__name__}({list(self)!r})"
+        return f"{type(self).__name__}([{', '.join(map(repr, self._inner))}])"
 
     def __eq__(self, other: object) -> bool:
         if isinstance(other, set):
-            return set(self) == other
+            return self._inner.keys() == other
         if not isinstance(other, StableSet):
             return NotImplemented  # pragma: no cover
         return self._inner == other._inner  # type: ignore
 
     def isdisjoint(self, other: Iterable[T]) -> bool:
-        if isinstance(other, Sized) and isinstance(other, Container) and len(other) > len(self):
-            return not any(value in other for value in self)
+        inner = self._inner
+        if isinstance(other, StableSet):
+            return inner.keys().isdisjoint(other._inner.keys())
+        if isinstance(other, (set, frozenset)):
+            # This iterates over the smaller of both sets
+            return inner.keys().isdisjoint(other)
+        if isinstance(other, Sized) and isinstance(other, Container) and len(other) > len(inner):
+            return not any(map(other.__contains__, inner))
 
-        return not any(value in self for value in other)
+        return not any(map(inner.__contains__, other))
 
     def issubset(self, other: Collection[T]) -> bool:
-        if isinstance(other, (list, tuple)) and len(other) * len(self) > 16:
-            other = set(other)
-        return all(value in other for value in self)
+        inner = self._inner
+        if len(inner) > len(other):
+            return False  # even with duplicates, other has too few distinct elements
+        if isinstance(other, StableSet):
+            return inner.keys() <= other._inner.keys()
+        if isinstance(other, (set, frozenset)):
+            return inner.keys() <= other
+        container: Container[Any] = other
+        if isinstance(other, (list, tuple)) and len(other) * len(inner) > 16:
+            container = set(other)
+        return all(map(container.__contains__, inner))
 
     def __le__(self, other: Self) -> bool:
         if not isinstance(other, StableSet):
             return NotImplemented  # pragma: no cover
-        return self.issubset(other)
+        return self._inner.keys() <= other._inner.keys()
 
     def __lt__(self, other: Self) -> bool:
         if not isinstance(other, StableSet):
             return NotImplemented  # pragma: no cover
-        return self.issubset(other) and self != other
+        return self._inner.keys() < other._inner.keys()
 
     def issuperset(self, other: Collection[T]) -> bool:
-        return all(value in self for value in other)
+        inner = self._inner
+        if isinstance(other, StableSet):
+            return inner.keys() >= other._inner.keys()
+        if isinstance(other, (set, frozenset)):
+            return inner.keys() >= other
+        return all(map(inner.__contains__, other))
 
     def __ge__(self, other: Self) -> bool:
         if not isinstance(other, StableSet):
             return NotImplemented  # pragma: no cover
-        return self.issuperset(other)
+        return self._inner.keys() >= other._inner.keys()
 
     def __gt__(self, other: Self) -> bool:
         if not isinstance(other, StableSet):
             return NotImplemented  # pragma: no cover
-        return self.issuperset(other) and self != other
+        return self._inner.keys() > other._inner.keys()
 
     def union(self, *others: Iterable[T]) -> StableSet[T]:
         """Return the union of this set and all others."""
@@ -95,26 +115,27 @@ class StableSet(Collection[T]):
     def __or__(self, other: Self) -> StableSet[T]:
         if not isinstance(other, StableSet):
             return NotImplemented  # pragma: no cover
-        return self.union(other)
+        return StableSet._from_inner({**self._inner, **other._inner})
 
     def intersection(self, *others: Iterable[T]) -> StableSet[T]:
         """Return the intersection of this set and all others."""
-        keep = set(self)
-        keep.intersection_update(*others)
-        return StableSet._from_inner({item: None for item in self if item in keep})
+        keep = set(self._inner).intersection(*others)
+        if len(keep) == len(self._inner):
+            return self.copy()
+        return StableSet._from_inner(dict.fromkeys(filter(keep.__contains__, self._inner)))
 
     def __and__(self, other: Self) -> StableSet[T]:
         if not isinstance(other, StableSet):
             return NotImplemented  # pragma: no cover
-        if len(other) > len(self):
-            return StableSet(value for value in self if value in other)
-        return StableSet(value for value in other if value in self)
+        small, large = (self, other) if len(other._inner) > len(self._inner) else (other, self)
+        return StableSet._from_inner(dict.fromkeys(filter(large._inner.__contains__, small._inner)))
 
     def difference(self, *others: Iterable[T]) -> StableSet[T]:
         """Return the difference of this set and all others."""
-        keep = set(self)
-        keep.difference_update(*others)
-        return StableSet._from_inner({item: None for item in self if item in keep})
+        keep = set(self._inner).difference(*others)
+        if len(keep) == len(self._inner):
+            return self.copy()
+        return StableSet._from_inner(dict.fromkeys(filter(keep.__contains__, self._inner)))
 
     def __sub__(self, other: Self) -> StableSet[T]:
         if not isinstance(other, StableSet):
@@ -123,7 +144,7 @@ class StableSet(Collection[T]):
 
     def symmetric_difference(self, other: Iterable[T]) -> StableSet[T]:
         """Return the symmetric difference of this set and another."""
-        if isinstance(other, StableSet) and len(other) > len(self):
+        if isinstance(other, StableSet) and len(other._inner) > len(self._inner):
             other, self = self, other
         result = self.copy()
         result.symmetric_difference_update(other)
@@ -150,12 +171,11 @@ class StableSet(Collection[T]):
         self._inner.pop(item, None)
 
     def pop(self) -> T:
-        """Remove and return an arbitrary element.
+        """Remove and return the most recently added element.
 
         Raises a `KeyError` if the set is empty.
         """
-        item, _none = self._inner.popitem()
-        return item
+        return self._inner.popitem()[0]
 
     def clear(self) -> None:
         """Remove all elements from the set."""
@@ -163,21 +183,23 @@ class StableSet(Collection[T]):
 
     def update(self, *others: Iterable[T]) -> None:
         """Update the set, adding elements from all others."""
+        inner = self._inner
         for other in others:
-            for item in other:
-                self._inner[item] = None
+            if isinstance(other, StableSet):
+                inner.update(other._inner)
+            else:
+                # Merging key/value pairs avoids building a temporary dict
+                inner.update(zip(other, repeat(None)))
 
     def __ior__(self, other: Self) -> StableSet[T]:
         if not isinstance(other, StableSet):
             return NotImplemented  # pragma: no cover
-        self.update(other)
+        self._inner.update(other._inner)
         return self
 
     def intersection_update(self, *others: Iterable[T]) -> None:
         """Update the set, keeping only elements found in all others."""
-        keep = set(self)
-        keep.intersection_update(*others)
-        self._inner = {item: None for item in self if item in keep}
+        self._retain(set(self._inner).intersection(*others))
 
     def __iand__(self, other: Self) -> StableSet[T]:
         if not isinstance(other, StableSet):
@@ -187,9 +209,7 @@ class StableSet(Collection[T]):
 
     def difference_update(self, *others: Iterable[T]) -> None:
         """Update the set, removing elements found in any other."""
-        keep = set(self)
-        keep.difference_update(*others)
-        self._inner = {item: None for item in self if item in keep}
+        self._retain(set(self._inner).difference(*others))
 
     def __isub__(self, other: Self) -> StableSet[T]:
         if not isinstance(other, StableSet):
@@ -197,13 +217,26 @@ class StableSet(Collection[T]):
         self.difference_update(other)
         return self
 
+    def _retain(self, keep: set[T]) -> None:
+        inner = self._inner
+        removed = len(inner) - len(keep)
+        if not removed:
+            return
+        if removed * 4 < len(inner):
+            # Deleting a few elements in place is cheaper than rebuilding the whole dict
+            for item in inner.keys() - keep:
+                del inner[item]
+        else:
+            self._inner = dict.fromkeys(filter(keep.__contains__, inner))
+
     def symmetric_difference_update(self, other: Iterable[T]) -> None:
         """Update the set, keeping only elements found in either set, but not in both."""
-        for value in other:
-            if value in self:
-                self.remove(value)
-            else:
-                self.add(value)
+        inner = self._inner
+        other_inner = other._inner if isinstance(other, StableSet) else dict.fromkeys(other)
+        common = inner.keys() & other_inner.keys()
+        for item in common:
+            del inner[item]
+        inner.update(zip(filterfalse(common.__contains__, other_inner), repeat(None)))
 
     def __ixor__(self, other: Self) -> StableSet[T]:
         if not isinstance(other, StableSet):
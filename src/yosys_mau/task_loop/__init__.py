@@ -1,40 +1,89 @@
-from . import context, logging, priority, process
-from ._task import (
-    ChildAborted,
-    ChildCancelled,
-    ChildFailed,
-    DebugEvent,
-    DependencyAborted,
-    DependencyCancelled,
-    DependencyFailed,
-    Task,
-    TaskAborted,
-    TaskCancelled,
-    TaskEvent,
-    TaskEventStream,
-    TaskFailed,
-    TaskGroup,
-    TaskLoopError,
-    TaskLoopInterrupted,
-    TaskStateChange,
-    current_task,
-    root_task,
-    run_task_loop,
-)
+from __future__ import annotations
 
-priority = priority
+import importlib
+import typing
 
-task_context = context.task_context
+if typing.TYPE_CHECKING:
+    from . import context, logging, priority, process  # noqa: F401
+    from ._task import (
+        ChildAborted,
+        ChildCancelled,
+        ChildFailed,
+        DebugEvent,
+        DependencyAborted,
+        DependencyCancelled,
+        DependencyFailed,
+        Task,
+        TaskAborted,
+        TaskCancelled,
+        TaskEvent,
+        TaskEventStream,
+        TaskFailed,
+        TaskGroup,
+        TaskLoopError,
+        TaskLoopInterrupted,
+        TaskStateChange,
+        current_task,
+        root_task,
+        run_task_loop,
+    )
+    from .context import task_context
+    from .logging import LogContext, log, log_debug, log_error, log_exception, log_warning
+    from .process import Process, ProcessEvent
 
-Process = process.Process
-ProcessEvent = process.ProcessEvent
+# The submodules and re-exported names are imported on first access, so that e.g. using only
+# `Task` doesn't load the logging and process modules.
+_submodules = {"context", "logging", "priority", "process"}
+
+_reexports = {
+    "._task": (
+        "ChildAborted",
+        "ChildCancelled",
+        "ChildFailed",
+        "DebugEvent",
+        "DependencyAborted",
+        "DependencyCancelled",
+        "DependencyFailed",
+        "Task",
+        "TaskAborted",
+        "TaskCancelled",
+        "TaskEvent",
+        "TaskEventStream",
+        "TaskFailed",
+        "TaskGroup",
+        "TaskLoopError",
+        "TaskLoopInterrupted",
+        "TaskStateChange",
+        "current_task",
+        "root_task",
+        "run_task_loop",
+    ),
+    ".context": ("task_context",),
+    ".process": ("Process", "ProcessEvent"),
+    ".logging": ("log", "log_debug", "log_warning", "log_error", "log_exception", "LogContext"),
+}
+
+_lazy_attributes = {name: module for module, names in _reexports.items() for name in names}
+
+
+def __getattr__(name: str) -> typing.Any:
+    if name in _submodules:
+        # Importing a submodule also binds it as an attribute of this package
+        return importlib.import_module(f".{name}", __name__)
+    module_name = _lazy_attributes.get(name)
+    if module_name is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    # Bind all names re-exported from the same module at once, so accessing them later doesn't
+    # go through this function again
+    module = importlib.import_module(module_name, __name__)
+    namespace = globals()
+    namespace.update({attr: getattr(module, attr) for attr in _reexports[module_name]})
+    return namespace[name]
+
+
+def __dir__() -> list[str]:
+    return sorted({*globals(), *_submodules, *_lazy_attributes})
 
-log = logging.log
-log_debug = logging.log_debug
-log_warning = logging.log_warning
-log_error = logging.log_error
-log_exception = logging.log_exception
-LogContext = logging.LogContext
 
 __all__ = [
     "Task",
@@ -6,8 +6,10 @@ import functools
 import gc
 import inspect
 import signal
+import types
 import typing
-from contextlib import contextmanager
+import weakref
+from collections import deque
 from contextvars import ContextVar
 from dataclasses import dataclass
 from itertools import count
@@ -15,8 +17,6 @@ from typing import Any, Awaitable, Callable, Generic, Iterator, Literal
 
 from typing_extensions import ParamSpec, Self
 
-from yosys_mau.stable_set import StableSet
-
 from . import job_server as job
 
 T = typing.TypeVar("T")
@@ -30,13 +30,22 @@ _cancel_on_sync_handler_exit: ContextVar[bool] = ContextVar(
 )
 
 
-@contextmanager
-def set_current_task(task: Task) -> typing.Iterator[None]:
-    token = _current_task.set(task)
-    try:
-        yield
-    finally:
-        _current_task.reset(token)
+class set_current_task:
+    """Context manager that temporarily overrides the current task.
+
+    Returned by `Task.as_current_task`.
+    """
+
+    __slots__ = ("task", "token")
+
+    def __init__(self, task: Task):
+        self.task = task
+
+    def __enter__(self) -> None:
+        self.token = _current_task.set(self.task)
+
+    def __exit__(self, *exc_info: Any) -> None:
+        _current_task.reset(self.token)
 
 
 class TaskLoopError(RuntimeError):
@@ -80,6 +89,10 @@ TaskState = Literal[
 
 
 def as_awaitable(fn: Callable[Args, T | Awaitable[T]]) -> Callable[Args, Awaitable[T]]:
+    if inspect.iscoroutinefunction(fn):
+        # Async functions (also behind `functools.partial`) already return an awaitable
+        return fn  # type: ignore
+
     def wrapper(*args: Args.args, **kwargs: Args.kwargs) -> Awaitable[T]:
         result = fn(*args, **kwargs)
         if not isinstance(result, Awaitable):
@@ -93,12 +106,30 @@ def as_awaitable(fn: Callable[Args, T | Awaitable[T]]) -> Callable[Args, Awaitab
     return wrapper
 
 
+def _takes_arguments(fn: Callable[..., Any]) -> bool:
+    """Whether the signature of ``fn`` has any parameters.
+
+    For plain functions this checks the code object directly, as `inspect.signature` is
+    comparatively slow.
+    """
+    if type(fn) is types.FunctionType and not fn.__dict__:
+        # Without attributes like __wrapped__ or __signature__, the signature follows the code
+        code = fn.__code__
+        return bool(
+            code.co_argcount
+            or code.co_kwonlyargcount
+            or code.co_flags & (inspect.CO_VARARGS | inspect.CO_VARKEYWORDS)
+        )
+    return bool(inspect.signature(fn).parameters)
+
+
 global_task_loop: TaskLoop | None = None
 
 
 class TaskLoop:
     root_task: RootTask
     task_eq_ids: Iterator[int]
+    observed_event_types: set[type[TaskEvent]]
 
     def __init__(
         self,
@@ -110,6 +141,9 @@ class TaskLoop:
         if global_task_loop is not None:
             raise TaskLoopError("a task loop is already installed")
         global_task_loop = self
+        # All event types that streams or sync handlers were ever registered for, events of other
+        # types are not dispatched at all
+        self.observed_event_types = set()
 
         async def wrapper():
             from . import priority
@@ -132,8 +166,11 @@ class TaskLoop:
 
             # Some __del__ implementations in the stdlib expect the event loop to be still running
             # and cause ignored exception warnings when they are cycle collected after the event
-            # loop exited. Manually triggering a cycle collection fixes this.
-            gc.collect()
+            # loop exited. Manually triggering a cycle collection fixes this. When automatic
+            # collection was disabled, the application manages collection itself (typically to
+            # avoid the cost of full collections over large task graphs), so respect that.
+            if gc.isenabled():
+                gc.collect()
 
         try:
             exception = asyncio.run(wrapper())
@@ -165,31 +202,82 @@ def run_task_loop(
 class ContextProxy(Generic[T]):
     """Provides access to on object using a specific task as current task."""
 
+    # Slots instead of instance attributes, so accessing them doesn't need to bypass the
+    # overridden attribute access methods
+    __slots__ = ("__task", "__wrapped")
+
     def __init__(self, task: Task, wrapped: T):
         """
         :param task: The task to use as current task when accessing the wrapped object.
         :param wrapped: The object to wrap.
         """
-        object.__setattr__(self, "__ContextProxy_task", task)
-        object.__setattr__(self, "__ContextProxy_wrapped", wrapped)
+        object.__setattr__(self, "_ContextProxy__task", task)
+        object.__setattr__(self, "_ContextProxy__wrapped", wrapped)
 
     def __getattr__(self, name: str) -> Any:
-        task = object.__getattribute__(self, "__ContextProxy_task")
-        wrapped = object.__getattribute__(self, "__ContextProxy_wrapped")
-        with task.as_current_task():
-            return getattr(wrapped, name)
+        token = _current_task.set(self.__task)
+        try:
+            return getattr(self.__wrapped, name)
+        finally:
+            _current_task.reset(token)
 
     def __setattr__(self, name: str, value: Any):
-        task = object.__getattribute__(self, "__ContextProxy_task")
-        wrapped = object.__getattribute__(self, "__ContextProxy_wrapped")
-        with task.as_current_task():
-            setattr(wrapped, name, value)
+        token = _current_task.set(self.__task)
+        try:
+            setattr(self.__wrapped, name, value)
+        finally:
+            _current_task.reset(token)
 
     def __delattr__(self, name: str):
-        task = object.__getattribute__(self, "__ContextProxy_task")
-        wrapped = object.__getattribute__(self, "__ContextProxy_wrapped")
-        with task.as_current_task():
-            delattr(wrapped, name)
+        token = _current_task.set(self.__task)
+        try:
+            delattr(self.__wrapped, name)
+        finally:
+            _current_task.reset(token)
+
+
+class _FinishedCallback:
+    """Done callback for the finished future of a dependency or child task.
+
+    This is a small object instead of a closure, as one is needed for every dependency and child.
+    """
+
+    __slots__ = ("notify", "owner", "task", "restart_counter")
+
+    def __init__(
+        self,
+        notify: Callable[[Task, Task, int], None],
+        owner: Task,
+        task: Task,
+        restart_counter: int,
+    ):
+        self.notify = notify
+        self.owner = owner
+        self.task = task
+        self.restart_counter = restart_counter
+
+    def __call__(self, _future: Any) -> None:
+        self.notify(self.owner, self.task, self.restart_counter)
+
+
+class _BlockFinishing:
+    """Context manager returned by `Task.block_finishing`.
+
+    A single instance is reused for every ``with`` block of a task, as it only forwards to the
+    task's counter updates.
+    """
+
+    __slots__ = ("enter", "exit")
+
+    def __init__(self, enter: Callable[[], None], exit: Callable[[], None]):
+        self.enter = enter
+        self.exit = exit
+
+    def __enter__(self) -> None:
+        self.enter()
+
+    def __exit__(self, *exc_info: Any) -> None:
+        self.exit()
 
 
 class Task:
@@ -201,32 +289,43 @@ class Task:
     """
 
     __name: str
+    __path: str | None
     __parent: Task | None
-    __children: StableSet[Task]
+    # Insertion ordered dicts with `None` values are used as ordered sets
+    __children: dict[Task, None]
     __child_names: set[str]
 
-    __dependencies: StableSet[Task]
-    __pending_dependencies: dict[Task, Callable[..., Any]]
-    __pending_children: dict[Task, Callable[..., Any]]
+    __dependencies: dict[Task, None]
+    __pending_dependencies: dict[Task, _FinishedCallback]
+    __pending_children: dict[Task, _FinishedCallback]
 
-    __reverse_dependencies: StableSet[Task]
+    # Weak, so that a dependency doesn't keep the tasks depending on it alive
+    __reverse_dependencies: weakref.WeakSet[Task]
 
-    __error_handlers: dict[Task | None, Callable[[BaseException], None]]
+    # The following containers are only needed by some tasks and created on first use
+    __error_handlers: dict[Task | None, Callable[[BaseException], None]] | None
+    # Per child name, a suffix such that all suffixes up to it are in use, to avoid rescanning
+    # them when making a child name unique
+    __child_name_suffixes: dict[str, int] | None
 
     __state: TaskState
 
     __aio_main_task: asyncio.Task[None]
-    __aio_background_tasks: StableSet[asyncio.Task[None]]
-    __aio_wait_background_tasks: StableSet[asyncio.Task[None]]
+    __aio_background_tasks: dict[asyncio.Task[None], None] | None
+    __aio_wait_background_tasks: dict[asyncio.Task[None], None] | None
     __background_task_counter: int
 
     __block_finish_counter: int
+    __block_finishing: _BlockFinishing | None
 
     __started: asyncio.Future[None]
     __finished: asyncio.Future[None]
 
-    __event_cursors: dict[type, asyncio.Future[TaskEventCursor[Any]]]
-    __event_sync_handlers: dict[type, StableSet[Callable[[Any], None]]]
+    # Streams are referenced weakly, so that abandoned streams stop receiving events
+    __event_streams: dict[type, list[weakref.ReferenceType[TaskEventStream[Any]]]] | None
+    # Handlers are stored as tuples that are replaced on changes, so emitting an event can iterate
+    # over them without copying, even when handlers unregister themselves
+    __event_sync_handlers: dict[type, tuple[Callable[[Any], None], ...]] | None
 
     __use_lease: bool
     __lease: job.Lease | None
@@ -272,7 +371,7 @@ class Task:
             ), "cannot change lease usage after the task is prepared"
         self.__use_lease = use_lease
         if not use_lease:
-            self.__lease = None
+            self.__release_lease()
 
     @property
     def parent(self) -> Task | None:
@@ -303,26 +402,46 @@ class Task:
     @name.setter
     def name(self, name: str) -> None:
         assert name
-        if self.parent is None:
+        parent = self.__parent
+        if parent is None:
             self.__set_name(name)
             return
 
         if self.__name:
-            self.parent.__child_names.remove(self.__name)
+            parent.__child_names.remove(self.__name)
+            parent.__free_name_suffix(self.__name)
 
-        if name not in self.parent.__child_names:
+        if name not in parent.__child_names:
             self.__set_name(name)
-            self.parent.__child_names.add(name)
+            parent.__child_names.add(name)
             return
 
-        for i in count(1):
-            if (unique_name := f"{name}#{i}") not in self.parent.__child_names:
+        if parent.__child_name_suffixes is None:
+            parent.__child_name_suffixes = {}
+        start = parent.__child_name_suffixes.get(name, 0) + 1
+
+        for i in count(start):
+            if (unique_name := f"{name}#{i}") not in parent.__child_names:
                 self.__set_name(unique_name)
-                self.parent.__child_names.add(unique_name)
+                parent.__child_names.add(unique_name)
+                parent.__child_name_suffixes[name] = i
                 break
 
+    def __free_name_suffix(self, child_name: str) -> None:
+        # All suffixes up to the remembered one are taken, lowering it below a freed suffix keeps
+        # that invariant, so freed names are still reused smallest first.
+        if self.__child_name_suffixes is None:
+            return
+        base, sep, suffix = child_name.rpartition("#")
+        if not sep or not suffix.isdigit():
+            return
+        last = self.__child_name_suffixes.get(base)
+        if last is not None and int(suffix) <= last:
+            self.__child_name_suffixes[base] = int(suffix) - 1
+
     def __set_name(self, name: str):
         self.__name = name
+        self.__invalidate_path()
         # if self.parent:
         #     self.__aio_main_task.set_name(f"{name} main")
 
@@ -333,9 +452,21 @@ class Task:
         Lists the names of the path from the containing top-level task to this task, separated by
         dots.
         """
-        if self.parent and self.parent.parent:
-            return f"{self.parent.path}.{self.name}"
-        return self.name
+        if self.__path is None:
+            parent = self.__parent
+            if parent and parent.__parent:
+                self.__path = f"{parent.path}.{self.__name}"
+            else:
+                self.__path = self.__name
+        return self.__path
+
+    def __invalidate_path(self) -> None:
+        # Paths are computed top-down, so descendants can only have a cached path if this task has
+        # one as well
+        if self.__path is not None:
+            self.__path = None
+            for child in self.__children:
+                child.__invalidate_path()
 
     def __str__(self) -> str:
         return self.path
@@ -360,36 +491,39 @@ class Task:
             alternative to subclassing `Task` and overriding `on_prepare`.
         """
         if on_run is not None:
-            if inspect.signature(on_run).parameters:
+            if _takes_arguments(on_run):
                 on_run = functools.partial(on_run, self)
             self.on_run = as_awaitable(on_run)  # type: ignore
         if on_prepare is not None:
-            if inspect.signature(on_prepare).parameters:
+            if _takes_arguments(on_prepare):
                 on_prepare = functools.partial(on_prepare, self)
             self.on_prepare = as_awaitable(on_prepare)  # type: ignore
 
         self.__name = ""
+        self.__path = None
         self.__state = "preparing"
-        self.__children = StableSet()
+        self.__children = {}
         self.__child_names = set()
-        self.__dependencies = StableSet()
+        self.__dependencies = {}
         self.__pending_dependencies = {}
         self.__pending_children = {}
-        self.__reverse_dependencies = StableSet()
-        self.__error_handlers = {}
+        self.__reverse_dependencies = weakref.WeakSet()
+        self.__error_handlers = None
+        self.__child_name_suffixes = None
         self.__started = asyncio.Future()
         self.__finished = asyncio.Future()
         self.__use_lease = False
         self.__lease = None
         self.__cleaned_up = False
-        self.__aio_background_tasks = StableSet()
-        self.__aio_wait_background_tasks = StableSet()
+        self.__aio_background_tasks = None
+        self.__aio_wait_background_tasks = None
         self.__background_task_counter = 0
-        self.__event_cursors = {}
-        self.__event_sync_handlers = {}
+        self.__event_streams = None
+        self.__event_sync_handlers = None
         self.__cancelled_by = None
         self.__cancellation_cause = None
         self.__block_finish_counter = 0
+        self.__block_finishing = None
         self.__restart_counter = 0
 
         self.discard = True
@@ -418,8 +552,7 @@ class Task:
             return
         old_state, self.__state = self.__state, new_state
         if self.__parent:
-            with self.as_current_task():
-                TaskStateChange(old_state, new_state).emit()
+            TaskStateChange._emit_from(self, old_state, new_state)
 
     def depends_on(self, task: Task) -> None:
         """Register a dependency on another task."""
@@ -427,11 +560,10 @@ class Task:
             "preparing",
             "pending",
         ), "cannot add dependencies after task has started"
-        self.__dependencies.add(task)
+        self.__dependencies[task] = None
         if task.state in ("preparing", "pending", "running"):
-            restart_counter = task.__restart_counter
-            callback: Callable[[Any], None] = lambda _: self.__dependency_finished(
-                task, restart_counter
+            callback = _FinishedCallback(
+                Task.__dependency_finished, self, task, task.__restart_counter
             )
             task.__finished.add_done_callback(callback)
             self.__pending_dependencies[task] = callback
@@ -453,6 +585,8 @@ class Task:
             recovered from the `TaskAborted` exception.
 
         """
+        if self.__error_handlers is None:
+            self.__error_handlers = {}
         self.__error_handlers[task] = handler
 
     def handle_error(self, handler: Callable[[BaseException], None]) -> None:
@@ -478,7 +612,7 @@ class Task:
         if self.__parent is not None:
             self.__parent.__add_child(self)
 
-        self.__reverse_dependencies = StableSet()
+        self.__reverse_dependencies = weakref.WeakSet()
 
         self.__aio_main_task = asyncio.create_task(self.__task_main(), name=f"{self.name} main")
 
@@ -489,10 +623,9 @@ class Task:
             "running",
             "waiting",
         ), f"cannot create child tasks in state {self.state}"
-        self.__children.add(task)
+        self.__children[task] = None
         if task.state in ("preparing", "pending", "running"):
-            restart_counter = task.__restart_counter
-            callback: Callable[[Any], None] = lambda _: self.__child_finished(task, restart_counter)
+            callback = _FinishedCallback(Task.__child_finished, self, task, task.__restart_counter)
             task.__finished.add_done_callback(callback)
             self.__pending_children[task] = callback
 
@@ -523,7 +656,7 @@ class Task:
         if self.__parent is not None and self.__parent.state in ("preparing", "pending"):
             return
         if self.__pending_dependencies:
-            self.__lease = None
+            self.__release_lease()
             return
         if self.__use_lease:
             from . import priority
@@ -535,6 +668,13 @@ class Task:
                 return
         self.__started.set_result(None)
 
+    def __release_lease(self) -> None:
+        lease, self.__lease = self.__lease, None
+        if lease is not None and lease.ready:
+            # Return the job slot right away instead of relying on the lease being garbage
+            # collected. Pending leases are only dropped, the scheduler skips dead requests.
+            lease.return_lease()
+
     def __check_finish(self) -> None:
         if self.state != "waiting":
             return
@@ -572,11 +712,12 @@ class Task:
 
         found = None
 
-        if handler := self.__error_handlers.get(None):
-            found = handler
+        if self.__error_handlers is not None:
+            if handler := self.__error_handlers.get(None):
+                found = handler
 
-        if handler := self.__error_handlers.get(task):
-            found = handler
+            if handler := self.__error_handlers.get(task):
+                found = handler
 
         ExceptionPropagation(task, exception, found is not None).emit()
 
@@ -596,20 +737,26 @@ class Task:
         __prev_task = _current_task.set(self)
         try:
             if not self.__restart_counter:
-                TaskStateChange(None, self.__state).emit()
-            await self.on_prepare()
+                TaskStateChange._emit_from(self, None, self.__state)
+            # Awaiting the default no-op handlers still creates a coroutine, so they are skipped
+            # unless overridden in a subclass or by the on_run/on_prepare constructor arguments
+            if "on_prepare" in self.__dict__ or type(self).on_prepare is not Task.on_prepare:
+                await self.on_prepare()
             self.__change_state("pending")
             self.__check_start()
             await self.started
             self.__change_state("running")
             for child in self.__children:
-                child.__check_start()
-            await self.on_run()
+                # Only pending children can start, avoid the call for all others
+                if child.__state == "pending":
+                    child.__check_start()
+            if "on_run" in self.__dict__ or type(self).on_run is not Task.on_run:
+                await self.on_run()
             if not self.__finished.done():
                 self.__change_state("waiting")
                 self.__check_finish()
             await self.finished
-            self.__lease = None
+            self.__release_lease()
             self.__change_state("done")
         except Exception as exc:
             self.__failed(exc)
@@ -622,25 +769,36 @@ class Task:
             return
         self.__cleaned_up = True
         self.on_cleanup()
-        self.__lease = None
+        self.__release_lease()
 
-        for task, callback in self.__pending_children.items():
-            task.__finished.remove_done_callback(callback)
+        # Leaf tasks that finished normally have nothing left to detach from, so all of the
+        # following is skipped for them
+        if self.__pending_children:
+            for task, callback in self.__pending_children.items():
+                task.__finished.remove_done_callback(callback)
 
-        for task, callback in self.__pending_dependencies.items():
-            task.__finished.remove_done_callback(callback)
-            task.__reverse_dependencies.remove(self)
-            if not task.__reverse_dependencies and task.discard:
-                asyncio.get_event_loop().call_soon(lambda: task.__cancel(discard=True))
+        if self.__pending_dependencies:
+            loop = asyncio.get_running_loop()
+            for task, callback in self.__pending_dependencies.items():
+                task.__finished.remove_done_callback(callback)
+                task.__reverse_dependencies.remove(self)
+                if not task.__reverse_dependencies and task.discard:
+                    loop.call_soon(task.__cancel, True)  # discard=True
 
-        for aio_task in self.__aio_background_tasks:
-            aio_task.cancel()
+        if self.__aio_background_tasks:
+            for aio_task in self.__aio_background_tasks:
+                aio_task.cancel()
 
-        for aio_task in self.__aio_wait_background_tasks:
-            aio_task.cancel()
+        if self.__aio_wait_background_tasks:
+            for aio_task in self.__aio_wait_background_tasks:
+                aio_task.cancel()
 
-        for cursor in self.__event_cursors.values():
-            cursor.cancel()
+        if self.__event_streams is not None:
+            for stream_refs in self.__event_streams.values():
+                for stream_ref in stream_refs:
+                    if (stream := stream_ref()) is not None:
+                        stream.__end_stream__()
+            self.__event_streams = None
 
         self.__aio_main_task.cancel()
         if asyncio.current_task() == self.__aio_main_task:
@@ -656,7 +814,7 @@ class Task:
             self.__cancel()
             return
 
-        self.__lease = None
+        self.__release_lease()
         if not self.__started.done():
             self.__started.set_exception(exc)
             self.__started.exception()
@@ -706,8 +864,11 @@ class Task:
     @property
     async def started(self) -> None:
         """Awaitable that resolves when the task has started running."""
+        started = self.__started
         try:
-            await asyncio.shield(self.__started)
+            # Cancelling the awaiting coroutine must not cancel the shared future, but shielding
+            # is only necessary while it is still pending
+            await (started if started.done() else asyncio.shield(started))
         except asyncio.CancelledError:
             raise TaskCancelled(self) from self.__cancellation_cause
         except BaseException as exc:
@@ -719,8 +880,9 @@ class Task:
 
         This includes successful completion, cancellations and failure.
         """
+        finished = self.__finished
         try:
-            await asyncio.shield(self.__finished)
+            await (finished if finished.done() else asyncio.shield(finished))
         except asyncio.CancelledError:
             raise TaskCancelled(self) from self.__cancellation_cause
         except BaseException as exc:
@@ -843,10 +1005,11 @@ class Task:
                 _current_task.reset(__prev_task)
                 if aio_task is not None:
                     if wait:
-                        self.__aio_wait_background_tasks.remove(aio_task)
+                        assert self.__aio_wait_background_tasks is not None
+                        del self.__aio_wait_background_tasks[aio_task]
                         self.__check_finish()
-                    else:
-                        self.__aio_background_tasks.discard(aio_task)
+                    elif self.__aio_background_tasks is not None:
+                        self.__aio_background_tasks.pop(aio_task, None)
 
         self.__background_task_counter += 1
         aio_task = asyncio.create_task(
@@ -857,31 +1020,54 @@ class Task:
             return aio_task
 
         if wait:
-            self.__aio_wait_background_tasks.add(aio_task)
+            if self.__aio_wait_background_tasks is None:
+                self.__aio_wait_background_tasks = {}
+            self.__aio_wait_background_tasks[aio_task] = None
         else:
-            self.__aio_background_tasks.add(aio_task)
+            if self.__aio_background_tasks is None:
+                self.__aio_background_tasks = {}
+            self.__aio_background_tasks[aio_task] = None
 
         return aio_task
 
     def __emit_event__(self, event: TaskEvent) -> None:
         assert event.source is self
 
+        event_types = type(event).__event_types__
+        if task_loop().observed_event_types.isdisjoint(event_types):
+            return
+
         current = self
 
         while current is not None:
-            for mro_item in type(event).mro():
-                sync_handlers = current.__event_sync_handlers.get(mro_item, ())
+            event_sync_handlers = current.__event_sync_handlers
+            event_streams = current.__event_streams
 
-                for handler in list(sync_handlers):
-                    handler(event)
+            if event_sync_handlers is None and event_streams is None:
+                current = current.__parent
+                continue
+
+            for mro_item in event_types:
+                if event_sync_handlers is not None:
+                    for handler in event_sync_handlers.get(mro_item, ()):
+                        handler(event)
 
-                cursor = current.__event_cursors.get(mro_item)
-                if cursor is None:
+                if event_streams is None:
                     continue
 
-                next_cursor: asyncio.Future[TaskEventCursor[Any]] = asyncio.Future()
-                cursor.set_result(TaskEventCursor(event, next_cursor))
-                current.__event_cursors[mro_item] = next_cursor
+                stream_refs = event_streams.get(mro_item)
+                if not stream_refs:
+                    continue
+
+                abandoned = False
+                for stream_ref in stream_refs:
+                    stream = stream_ref()
+                    if stream is None:
+                        abandoned = True
+                    else:
+                        stream.__push_event__(event)
+                if abandoned:
+                    event_streams[mro_item] = [ref for ref in stream_refs if ref() is not None]
 
             current = current.__parent
 
@@ -896,10 +1082,16 @@ class Task:
         Note that using ``event_type`` is more efficient than a ``where`` predicate that uses
         `isinstance`.
         """
-        if event_type not in self.__event_cursors:
-            self.__event_cursors[event_type] = asyncio.Future()
-        cursor = self.__event_cursors[event_type]
-        return TaskEventStream(cursor, where or (lambda _: True))
+        _observe_event_type(event_type)
+        stream = TaskEventStream(where)
+        if self.__cleaned_up:
+            # No further events will be delivered
+            stream.__end_stream__()
+            return stream
+        if self.__event_streams is None:
+            self.__event_streams = {}
+        self.__event_streams.setdefault(event_type, []).append(weakref.ref(stream))
+        return stream
 
     def sync_handle_events(
         self,
@@ -915,25 +1107,42 @@ class Task:
         :param handler: The handler to call for each event.
         :return: A callable that can be called to unregister the handler.
         """
-        if event_type not in self.__event_sync_handlers:
-            self.__event_sync_handlers[event_type] = StableSet()
+        _observe_event_type(event_type)
+        if self.__event_sync_handlers is None:
+            self.__event_sync_handlers = {}
+        sync_handlers = self.__event_sync_handlers
 
         def wrapper(event: T_TaskEvent):
-            token = _in_sync_handler.set(True)
+            # The context variables are only changed when necessary, i.e. not for events emitted
+            # by this task itself and not for nested sync handler invocations.
+            outermost = not _in_sync_handler.get()
+            token = _in_sync_handler.set(True) if outermost else None
             try:
-                with self.as_current_task():
+                if _current_task.get(None) is self:
                     handler(event)
+                else:
+                    task_token = _current_task.set(self)
+                    try:
+                        handler(event)
+                    finally:
+                        _current_task.reset(task_token)
             except BaseException as exc:
                 self.__failed(exc)
             finally:
-                _in_sync_handler.reset(token)
-                if not _in_sync_handler.get() and _cancel_on_sync_handler_exit.get():
-                    _cancel_on_sync_handler_exit.set(False)
-                    raise asyncio.CancelledError()
+                if token is not None:
+                    _in_sync_handler.reset(token)
+                    if _cancel_on_sync_handler_exit.get():
+                        _cancel_on_sync_handler_exit.set(False)
+                        raise asyncio.CancelledError()
+
+        sync_handlers[event_type] = (*sync_handlers.get(event_type, ()), wrapper)
 
-        self.__event_sync_handlers[event_type].add(wrapper)
+        def unregister() -> None:
+            handlers = sync_handlers.get(event_type, ())
+            if wrapper in handlers:
+                sync_handlers[event_type] = tuple(h for h in handlers if h is not wrapper)
 
-        return lambda: self.__event_sync_handlers[event_type].discard(wrapper)
+        return unregister
 
     def as_current_task(self) -> typing.ContextManager[None]:
         """Returns a context manager that temporarily overrides the current task.
@@ -943,19 +1152,27 @@ class Task:
         """
         return set_current_task(self)
 
-    @contextmanager
-    def block_finishing(self) -> typing.Iterator[None]:
+    def block_finishing(self) -> typing.ContextManager[None]:
         """Returns a context manager that blocks the task from finishing.
 
         This is useful in in `background` coroutines that do not have ``wait`` set, but temporarily
         need to prevent the task from finishing.
         """
+        if self.__block_finishing is None:
+            self.__block_finishing = _BlockFinishing(self.__block_finish, self.__unblock_finish)
+        return self.__block_finishing
+
+    def __block_finish(self) -> None:
         self.__block_finish_counter += 1
-        try:
-            yield
-        finally:
-            self.__block_finish_counter -= 1
-            self.__check_finish()
+
+    def __unblock_finish(self) -> None:
+        self.__block_finish_counter -= 1
+        self.__check_finish()
+
+
+def _observe_event_type(event_type: type) -> None:
+    assert issubclass(event_type, TaskEvent), "events are dispatched by TaskEvent subclasses only"
+    task_loop().observed_event_types.add(event_type)
 
 
 class TaskGroup(Task):
@@ -1072,6 +1289,14 @@ class TaskEvent:
     `Task.as_current_task` block.
     """
 
+    # The event types in the MRO, i.e. the types that handlers and streams can be registered for
+    __event_types__: typing.ClassVar[tuple[type[TaskEvent], ...]]
+    __event_field_names__: typing.ClassVar[tuple[str, ...]]
+
+    # The task loop's own events declare slots (matching their dataclass fields) as they are
+    # created frequently. Subclasses without `__slots__` still get an instance `__dict__`.
+    __slots__ = ("__source",)
+
     def __post_init__(self) -> None:
         self.__source = current_task_or_none()
 
@@ -1079,12 +1304,39 @@ class TaskEvent:
         # This is a hack that prevents dataclasses from adding a __repr__ method without requiring
         # the ``repr=false`` argument to `dataclass`.
         cls.__repr__ = cls.__repr__
+        cls.__event_types__ = tuple(c for c in cls.__mro__ if issubclass(c, TaskEvent))
+
+    @classmethod
+    def __field_names(cls) -> tuple[str, ...]:
+        # The field names are cached per class on first use, as `__init_subclass__` runs before
+        # the `dataclass` decorator adds the fields.
+        names = cls.__dict__.get("__event_field_names__")
+        if names is None:
+            names = tuple(field.name for field in dataclasses.fields(cls))
+            cls.__event_field_names__ = names
+        return names
+
+    @classmethod
+    def _emit_from(cls, source: Task, *args: Any) -> None:
+        """Create and emit an event with the given source task and positional field values.
+
+        Used by the task loop itself, this neither requires ``source`` to be the current task nor
+        constructs the event when nothing subscribed to its type.
+        """
+        if task_loop().observed_event_types.isdisjoint(cls.__event_types__):
+            return
+        event = cls.__new__(cls)
+        names = cls.__field_names()
+        assert len(args) == len(names)
+        for name, value in zip(names, args):
+            setattr(event, name, value)
+        event.__source = source
+        source.__emit_event__(event)
 
     def __repr__(self):
-        out: list[str] = []
-        for field in dataclasses.fields(self):
-            out.append(f"{field.name}={getattr(self, field.name)!r}")
-        return f"{self.source}: {self.__class__.__qualname__}({', '.join(out)})"
+        cls = self.__class__
+        out = ", ".join([f"{name}={getattr(self, name)!r}" for name in cls.__field_names()])
+        return f"{self.source}: {cls.__qualname__}({out})"
 
     @property
     def source(self) -> Task:
@@ -1102,10 +1354,7 @@ class TaskEvent:
         self.source.__emit_event__(self)
 
 
-@dataclass
-class TaskEventCursor(typing.Generic[T_TaskEvent]):
-    event: T_TaskEvent
-    tail: asyncio.Future[TaskEventCursor[T_TaskEvent]]
+TaskEvent.__event_types__ = (TaskEvent,)
 
 
 class TaskEventStream(typing.AsyncIterator[T_TaskEvent]):
@@ -1116,33 +1365,61 @@ class TaskEventStream(typing.AsyncIterator[T_TaskEvent]):
     To handle events synchronously, use `Task.sync_handle_events` instead of this.
     """
 
-    __cursor: asyncio.Future[TaskEventCursor[T_TaskEvent]]
-    __where: Callable[[T_TaskEvent], bool]
+    # `None` marks the end of the stream
+    __events: deque[T_TaskEvent | None]
+    # Only exists while a consumer is waiting for the next event
+    __waiter: asyncio.Future[None] | None
+    # Without a predicate all events are yielded, avoiding a call per event
+    __where: Callable[[T_TaskEvent], bool] | None
 
-    def __init__(
-        self,
-        cursor: asyncio.Future[TaskEventCursor[T_TaskEvent]],
-        where: Callable[[T_TaskEvent], bool],
-    ):
-        self.__cursor = cursor
+    def __init__(self, where: Callable[[T_TaskEvent], bool] | None = None):
+        self.__events = deque()
+        self.__waiter = None
         self.__where = where
 
+    def __push_event__(self, event: T_TaskEvent | None) -> None:
+        self.__events.append(event)
+        waiter = self.__waiter
+        if waiter is not None:
+            # Wake the consumer once, it takes all events queued until it runs without awaiting
+            self.__waiter = None
+            if not waiter.done():
+                waiter.set_result(None)
+
+    def __end_stream__(self) -> None:
+        self.__push_event__(None)
+
     def __aiter__(self) -> Self:
         return self
 
     async def __anext__(self) -> T_TaskEvent:
+        events = self.__events
         while True:
-            try:
-                cursor = await self.__cursor
-            except asyncio.CancelledError:
-                aio_task = asyncio.current_task()
-                if aio_task and aio_task.done() and (aio_task.cancelled() or aio_task.exception()):
-                    raise
+            if not events:
+                if self.__waiter is None:
+                    self.__waiter = asyncio.Future()
+                waiter = self.__waiter
+                try:
+                    await waiter
+                except asyncio.CancelledError:
+                    if self.__waiter is waiter:
+                        self.__waiter = None
+                    aio_task = asyncio.current_task()
+                    if (
+                        aio_task
+                        and aio_task.done()
+                        and (aio_task.cancelled() or aio_task.exception())
+                    ):
+                        raise
+                    raise StopAsyncIteration
+                continue
+
+            result = events.popleft()
+            if result is None:
+                # Keep the end marker, so the stream stays exhausted
+                events.appendleft(None)
                 raise StopAsyncIteration
-
-            result = cursor.event
-            self.__cursor = cursor.tail
-            if self.__where(result):
+            if self.__where is None or self.__where(result):
                 return result
 
     def process(
@@ -1169,14 +1446,16 @@ class TaskEventStream(typing.AsyncIterator[T_TaskEvent]):
 
         :param handler: An async or sync function that receives each event as argument.
         """
-        handler = as_awaitable(handler)
-
         task = current_task()
 
         async def stream_handler():
             async for event in self:
                 with task.block_finishing():
-                    await handler(event)
+                    # Calling the handler directly, instead of through `as_awaitable`, avoids
+                    # creating a coroutine per event for sync handlers
+                    result = handler(event)
+                    if result is not None and isinstance(result, Awaitable):
+                        await result
 
         task.background(stream_handler, wait=False)
 
@@ -1184,15 +1463,21 @@ class TaskEventStream(typing.AsyncIterator[T_TaskEvent]):
 class TaskLoopInterrupted(TaskEvent):
     """Event emitted when the task loop is interrupted by a signal."""
 
+    __slots__ = ()
+
 
 class DebugEvent(TaskEvent):
     """Base class for debug events emitted by the task loop itself."""
 
+    __slots__ = ()
+
 
 @dataclass(repr=False)
 class TaskStateChange(DebugEvent):
     """Event emitted whenever a task changes state."""
 
+    __slots__ = ("previous_state", "state")
+
     previous_state: TaskState | None
     state: TaskState
 
@@ -1202,6 +1487,8 @@ class TaskStateChange(DebugEvent):
 
 @dataclass
 class ExceptionPropagation(DebugEvent):
+    __slots__ = ("exc_source", "exc", "handler")
+
     exc_source: Task
     exc: BaseException
     handler: bool
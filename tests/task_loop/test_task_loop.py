@@ -5,6 +5,7 @@ import re
 import signal
 import subprocess
 import sys
+from dataclasses import dataclass
 
 import pytest
 import yosys_mau.task_loop as tl
@@ -187,6 +188,150 @@ def test_dependencies_handled_failure():
     assert len(handled) == 2
 
 
+def test_cancel_discards_unused_dependencies():
+    states: list[str] = []
+
+    def main():
+        async def on_dependency():
+            await asyncio.sleep(1)
+
+        task1 = tl.Task(on_run=on_dependency, name="task1")
+        task2 = tl.Task(on_run=on_dependency, name="task2")
+        task3 = tl.Task(name="task3")
+
+        task3.depends_on(task1)
+        task3.depends_on(task2)
+
+        tl.current_task().set_error_handler(None, lambda exc: None)
+
+        async def on_cancel_task3():
+            await task1.started
+            await task2.started
+            task3.cancel()
+            await asyncio.sleep(0)
+            states.extend(task.state for task in (task1, task2, task3))
+
+        tl.Task(on_run=on_cancel_task3)
+
+    tl.run_task_loop(main)
+
+    assert states == ["discarded", "discarded", "cancelled"]
+
+
+def test_task_path():
+    def main():
+        parent = tl.Task(name="parent")
+        with parent.as_current_task():
+            child = tl.Task(name="child")
+
+        assert child.path == "parent.child"
+
+        parent.name = "renamed"
+        assert child.path == "renamed.child"
+        assert str(child) == "renamed.child"
+
+    tl.run_task_loop(main)
+
+
+def test_unique_names():
+    def main():
+        tasks = [tl.Task(name="task") for _ in range(3)]
+        assert [task.name for task in tasks] == ["task", "task#1", "task#2"]
+
+        tasks[1].name = "other"
+        assert tl.Task(name="task").name == "task#1"
+        assert tl.Task(name="task").name == "task#3"
+
+    tl.run_task_loop(main)
+
+
+def test_unique_names_renamed_in_constructor():
+    class Named(tl.Task):
+        def __init__(self, name: str):
+            super().__init__()
+            self.name = name
+
+    def main():
+        tasks = [Named("task") for _ in range(3)]
+        assert [task.name for task in tasks] == ["task", "task#1", "task#2"]
+
+        # The names taken before renaming were all freed again
+        assert tl.Task(name="Named").name == "Named"
+        assert tl.Task(name="Named").name == "Named#1"
+
+        tasks[0].name = "other"
+        tasks[1].name = "other"
+        assert [task.name for task in tasks] == ["other", "other#1", "task#2"]
+        assert Named("task").name == "task"
+        assert Named("task").name == "task#1"
+        assert Named("task").name == "task#3"
+
+    tl.run_task_loop(main)
+
+
+def test_sync_handler_unregister():
+    calls: list[str] = []
+
+    def main():
+        def once(event: tl.TaskEvent):
+            calls.append("once")
+            remove_once()
+
+        remove_once = tl.current_task().sync_handle_events(tl.TaskEvent, once)
+        tl.current_task().sync_handle_events(tl.TaskEvent, lambda event: calls.append("always"))
+
+        tl.TaskLoopInterrupted().emit()
+        tl.TaskLoopInterrupted().emit()
+
+    tl.run_task_loop(main)
+
+    assert calls == ["once", "always", "always"]
+
+
+def test_event_stream():
+    received: list[int] = []
+
+    @dataclass
+    class ExampleEvent(tl.TaskEvent):
+        value: int
+
+    def main():
+        task = tl.Task(name="task")
+        events = task.events(ExampleEvent, where=lambda event: event.value % 2 == 0)
+
+        async def consume():
+            async for event in events:
+                received.append(event.value)
+
+        tl.current_task().background(consume, wait=True)
+
+        async def on_run():
+            for i in range(5):
+                ExampleEvent(i).emit()
+
+        task.on_run = on_run
+
+    tl.run_task_loop(main)
+
+    assert received == [0, 2, 4]
+
+
+def test_state_change_events():
+    states: list[tuple[str | None, str]] = []
+
+    def main():
+        tl.current_task().sync_handle_events(
+            tl.TaskStateChange, lambda event: states.append((event.previous_state, event.state))
+        )
+
+        tl.Task(name="task")
+
+    tl.run_task_loop(main)
+
+    assert states[:3] == [(None, "preparing"), ("preparing", "pending"), ("pending", "running")]
+    assert states[-1] == ("waiting", "done")
+
+
 def test_sigint():
     process = subprocess.Popen(
         [sys.executable, __file__, inner_sigint.__name__],
@@ -1,21 +1,27 @@
 from __future__ import annotations
 
+import copy
+import pickle
 import re
 import tempfile
 from contextlib import contextmanager
 from pathlib import Path
+from textwrap import dedent
 
 import pytest
 from hypothesis import given
 from hypothesis import strategies as st
 from yosys_mau.source_str import (
+    concat,
     from_content,
+    plain_str,
     read_file,
     source_map,
 )
 from yosys_mau.source_str import (
     re as source_re,
 )
+from yosys_mau.source_str.report import InputError
 
 
 @contextmanager
@@ -70,10 +76,91 @@ def test_source_map_to_str():
     assert repr(source_map(combined)) == "file_c(/absolute/file_c):1:1-2:2,/file_d:1:1-10"
 
 
+@given(st.text(), st.integers(-20, 20) | st.none(), st.integers(-20, 20) | st.none())
+def test_slice(text: str, start: int | None, end: int | None):
+    source_text = from_content(text, "input-file")
+    sliced = source_text[start:end]
+    assert sliced == text[start:end]
+
+    sliced_map = source_map(sliced)
+    assert len(sliced_map) == len(sliced)
+    if sliced:
+        assert sliced_map.spans[0].file_start == slice(start, end).indices(len(text))[0]
+    if sliced == text:
+        assert sliced is source_text
+
+
+def char_origins(string: str) -> list[tuple[str, int] | None]:
+    origins: list[tuple[str, int] | None] = [None] * len(string)
+    for span in source_map(string).spans:
+        for i in range(span.len):
+            origins[span.str_start + i] = (span.file.absolute_path.name, span.file_start + i)
+    return origins
+
+
+@given(
+    st.lists(st.tuples(st.text(max_size=3), st.integers(0, 10), st.integers(0, 10))),
+    st.integers(-40, 40) | st.none(),
+    st.integers(-40, 40) | st.none(),
+)
+def test_slice_multiple_spans(
+    parts: list[tuple[str, int, int]], start: int | None, end: int | None
+):
+    source_text = from_content("0123456789", "input-file")
+    text = concat(plain + source_text[part_start:part_end] for plain, part_start, part_end in parts)
+
+    assert char_origins(text[start:end]) == char_origins(text)[start:end]
+
+
+def test_plain_str():
+    source_text = from_content("content", "input-file")
+    plain = plain_str(source_text)
+
+    assert type(plain) is str
+    assert plain == source_text
+    assert not source_map(plain)
+
+
+def test_copy_source_map():
+    source_text = from_content("content\nmore content", "input-file")
+    text = "prefix " + source_text[3:10] + source_text[12:]
+
+    assert copy.copy(source_map(text)) == source_map(text)
+    assert copy.deepcopy(source_map(text)) == source_map(text)
+
+
+def test_close_gaps():
+    source_a = from_content("content_a\nline 2\nline 3\nline 4\nline 5\nline 6", "file_a")
+    source_b = from_content("content_b", "file_b")
+
+    combined = source_a[:2] + source_b[:3] + source_a[40:] + source_a[4:6] + source_b[7:]
+    spans = source_map(combined).detached()
+
+    assert str(spans.close_gaps()) == "file_a:1:1-7,file_a:6:3-7,file_b:1:1-4,file_b:1:8-10"
+    assert str(spans.close_gaps(line_mode=True)) == "file_a:1:1-7,file_a:6:3-7,file_b:1:1-10"
+    assert list(spans.group_by_file()) == [
+        source_map(source_a).spans[0].file,
+        source_map(source_b).spans[0].file,
+    ]
+
+
 @given(st.text(), st.booleans())
 def test_splitlines(text: str, keepends: bool):
     source_text = from_content(text, "input-file")
-    assert source_text.splitlines() == text.splitlines()
+    assert source_text.splitlines(keepends) == text.splitlines(keepends)
+
+
+@given(st.text(alphabet="ab \r\n\x85"), st.booleans())
+def test_splitlines_source_map(text: str, keepends: bool):
+    source_text = from_content(text, "input-file")
+    lines = source_text.splitlines(keepends)
+    assert lines == text.splitlines(keepends)
+
+    pos = 0
+    for line in lines:
+        pos = text.index(line, pos)
+        assert source_map(line) == source_map(source_text[pos : pos + len(line)])
+        pos += len(line)
 
 
 @given(st.text())
@@ -149,6 +236,23 @@ def test_replace(text: str, old: str, new: str, count: int):
     assert source_text.replace(old, new, count) == text.replace(old, new, count)
 
 
+@given(st.text(), st.lists(st.tuples(st.integers(0, 20), st.integers(0, 20), st.text(max_size=3))))
+def test_concat(text: str, parts: list[tuple[int, int, str]]):
+    source_text = from_content(text, "input-file")
+    strings = [
+        source_text[min(start, len(text)) : min(end, len(text))] + plain
+        for start, end, plain in parts
+    ]
+
+    expected_map = source_map("")
+    for string in strings:
+        expected_map += source_map(string)
+
+    result = concat(strings)
+    assert result == "".join(strings)
+    assert source_map(result) == expected_map
+
+
 def check_re_match(source_match: source_re.Match | None, match: re.Match[str] | None):
     if match is None:
         assert source_match is None
@@ -203,6 +307,46 @@ def test_re_split(text: str, words: list[str], maxsplit: int):
     assert source_re.split(regex, source_text, maxsplit) == re.split(regex, text, maxsplit)
 
 
+@given(st.text(), st.lists(st.text(), min_size=1), st.integers(0, 10))
+def test_re_split_plain_str(text: str, words: list[str], maxsplit: int):
+    regex = "|".join(re.escape(word) for word in words)
+    for pattern in (regex, f"({regex})"):
+        assert source_re.split(pattern, text, maxsplit) == source_re.split(
+            pattern, from_content(text, "input-file"), maxsplit
+        )
+        assert source_re.findall(pattern, text) == source_re.findall(
+            pattern, from_content(text, "input-file")
+        )
+
+
+def test_re_pattern_pickle():
+    pattern = source_re.compile("a(?P<b>b)")
+    restored = pickle.loads(pickle.dumps(pattern))
+    assert restored == pattern
+    assert restored.groupindex == {"b": 1}
+
+
+def test_source_span_pickle():
+    with with_temp_file(EXAMPLE_FILE_CONTENT) as path:
+        text = read_file(path, store_content=False)
+
+    text_map = source_map(text[5:40])
+    map_span = text_map.spans[0]
+    span = text_map.detached().spans[0]
+
+    for value in (span, map_span, text_map):
+        restored = pickle.loads(pickle.dumps(value))
+        assert type(restored) is type(value)
+        assert str(restored) == str(value)
+
+    restored_span = pickle.loads(pickle.dumps(map_span))
+    assert (restored_span.len, restored_span.file_start, restored_span.str_start) == (
+        map_span.len,
+        map_span.file_start,
+        map_span.str_start,
+    )
+
+
 @given(st.text(), st.lists(st.text(), min_size=1))
 def test_re_findall(text: str, words: list[str]):
     source_text = from_content(text, "input-file")
@@ -289,6 +433,31 @@ def test_re_expand(template: str):
     assert expected == obtained
 
 
+@given(st.text(alphabet="\\gn<>0123456789ab"))
+def test_re_expand_groups(template: str):
+    regex = "(f)(x)?(?P<n>o)" + "(o)" * 8
+    text = "foooooooooo"
+    source_text = from_content(text, "input-file")
+
+    match = re.match(regex, text)
+    source_match = source_re.match(regex, source_text)
+
+    assert match is not None
+    assert source_match is not None
+
+    try:
+        expected = True, match.expand(template)
+    except Exception as e:
+        expected = False, str(e)
+
+    try:
+        obtained = True, source_match.expand(template)
+    except Exception as e:
+        obtained = False, str(e)
+
+    assert expected == obtained
+
+
 @given(st.text(), st.lists(st.text(), min_size=1), st.text(), st.integers(0, 10))
 def test_re_subn(text: str, words: str, repl: str, count: int):
     source_text = from_content(text, "input-file")
@@ -300,3 +469,59 @@ def test_re_subn(text: str, words: str, repl: str, count: int):
     assert source_re.subn(regex, repl_fn, source_text, count) == re.subn(
         regex, repl_fn, text, count
     )
+
+
+def test_re_compile_cache():
+    pattern = source_re.compile("a+", source_re.IGNORECASE)
+    assert source_re.compile("a+", source_re.IGNORECASE) is pattern
+    assert source_re.compile("a+") is not pattern
+
+    source_re.purge()
+    assert source_re.compile("a+", source_re.IGNORECASE) is not pattern
+
+
+REPORT_FILE_CONTENT = "".join(f"line {i} with some text\n" for i in range(1, 15))
+
+
+def test_report_multiline_spans():
+    source_text = from_content(REPORT_FILE_CONTENT, "input-file")
+    where = source_text[0:3] + source_text[100:140]
+
+    expected = """\
+        message
+        input-file:
+         1 | line 1 with some text
+           | ^^^
+         2 | line 2 with some text
+           :
+         4 | line 4 with some text
+         5 | line 5 with some text
+           |             ^^^^^^^^^^
+         6 | line 6 with some text
+           | ^^^^^^^^^^^^^^^^^^^^^^
+         7 | line 7 with some text
+           | ^^^^^^^^
+         8 | line 8 with some text
+    """
+    assert str(InputError(where, "message")) == dedent(expected)
+
+
+def test_report_overlapping_spans():
+    source_text = from_content(REPORT_FILE_CONTENT, "input-file")
+    where = source_text[20:25] + source_text[200:210] + source_text[22:28]
+
+    expected = """\
+        message
+        input-file:
+         1 | line 1 with some text
+           |                     ^^
+         2 | line 2 with some text
+           | ^^^^^^
+         3 | line 3 with some text
+           :
+         9 | line 9 with some text
+        10 | line 10 with some text
+           |   ^^^^^^^^^^
+        11 | line 11 with some text
+    """
+    assert str(InputError(where, "message")) == dedent(expected)
@@ -20,6 +20,13 @@ def test_union(items_a: list[str], items_b: list[str]):
     assert as_stable_set_a | as_stable_set_b == as_set_a | as_set_b
 
 
+@given(st.lists(st.integers()), st.lists(st.lists(st.integers())))
+def test_union_many(items_a: list[str], items_b: list[list[str]]):
+    others = [StableSet(items) if i % 2 else items for i, items in enumerate(items_b)]
+    union = StableSet(items_a).union(*others)
+    assert list(union) == list(dict.fromkeys([*items_a, *(item for b in items_b for item in b)]))
+
+
 @given(st.lists(st.integers()), st.lists(st.integers()))
 def test_intersection(items_a: list[str], items_b: list[str]):
     as_set_a, as_set_b = set(items_a), set(items_b)
@@ -69,6 +76,15 @@ def test_issubset_list(items_a: list[str], items_b: list[str]):
     assert as_set_a.issubset(items_b) == as_stable_set_a.issubset(items_b)
 
 
+@given(st.lists(st.integers()), st.lists(st.integers()))
+def test_issubset_issuperset_set(items_a: list[str], items_b: list[str]):
+    as_set_a, as_set_b = set(items_a), set(items_b)
+    as_stable_set_a = StableSet(items_a)
+    assert as_stable_set_a.issubset(as_set_b) == as_set_a.issubset(as_set_b)
+    assert as_stable_set_a.issuperset(as_set_b) == as_set_a.issuperset(as_set_b)
+    assert as_stable_set_a.issuperset(items_b) == as_set_a.issuperset(items_b)
+
+
 @given(st.lists(st.integers()), st.lists(st.integers()))
 def test_issuperset(items_a: list[str], items_b: list[str]):
     as_set_a, as_set_b = set(items_a), set(items_b)
@@ -135,3 +151,25 @@ def test_symmetric_difference_update(items_a: list[str], items_b: list[str]):
     as_stable_set_a ^= StableSet(items_b)
 
     assert as_stable_set_a == as_set_a
+
+
+@given(st.lists(st.integers()), st.lists(st.integers()))
+def test_symmetric_difference_update_list(items_a: list[str], items_b: list[str]):
+    as_set_a = set(items_a)
+    as_set_a.symmetric_difference_update(items_b)
+    as_stable_set_a = StableSet(items_a)
+    as_stable_set_a.symmetric_difference_update(items_b)
+
+    assert as_stable_set_a == as_set_a
+    assert list(as_stable_set_a) == [
+        *(value for value in StableSet(items_a) if value not in items_b),
+        *(value for value in StableSet(items_b) if value not in items_a),
+    ]
+
+
+@given(st.lists(st.integers()))
+def test_pop(items: list[str]):
+    as_stable_set = StableSet(items)
+    popped = [as_stable_set.pop() for _ in range(len(as_stable_set))]
+    assert popped == list(StableSet(items))[::-1]
+    assert not as_stable_set